@@ -1,3 +1,4 @@
+from datetime import timedelta
 from pathlib import Path
 import os
 
@@ -28,14 +29,20 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.tracing.tracing_middleware',
+    'core.metrics.metrics_middleware',
+    'core.querystats.query_stats_middleware',
+    'core.slowqueries.slow_query_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.profiling_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'core.routers.replica_pinning_middleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -60,14 +67,65 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        # Connections go back to the pool at the end of each request.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'HEALTH_CHECK_INTERVAL': int(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+        },
     }
 }
 
+# Read replicas of the default database, as comma separated hosts.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Shards for recipes and messages, as comma separated hosts (see core.sharding).
+DATABASE_SHARDS = ['default']
+for index, host in enumerate(filter(None, os.environ.get('DB_SHARD_HOSTS', '').split(','))):
+    alias = f'shard{index + 1}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip()}
+    DATABASE_SHARDS.append(alias)
+# Seconds a process caches the bucket to shard map.
+SHARD_MAP_TTL = int(os.environ.get('SHARD_MAP_TTL', 30))
+# Runs tests not using every shard unsharded and adds test-only databases.
+TEST_RUNNER = 'core.tests.runner.ShardedTestRunner'
+
+DATABASE_ROUTERS = ['core.sharding.ShardRouter', 'core.routers.PrimaryReplicaRouter']
+# Models always read from the primary, e.g. tokens used right after login.
+DATABASE_PRIMARY_MODELS = ['core.devicetoken']
+# Seconds a user's reads stay on the primary after they write.
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# Cookie pinning a client's reads to the primary after it writes.
+REPLICA_PIN_COOKIE = 'replica_pin'
+# Django cache also pinning a user's reads after a write, e.g. for token
+# clients ignoring cookies; it must be shared between processes.
+REPLICA_PIN_CACHE_ALIAS = os.environ.get('REPLICA_PIN_CACHE_ALIAS') or None
+
+PASSWORD_HASHERS = [
+    'core.hashing.TimedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -99,22 +157,81 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+MESSAGE_RETENTION_DAYS = int(os.environ.get('MESSAGE_RETENTION_DAYS', 365))
+MESSAGE_ARCHIVE_DIR = os.environ.get('MESSAGE_ARCHIVE_DIR', '/vol/web/archive')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.CustomPagination',
     'PAGE_SIZE': 10,
 }
 
+AUTH_TOKEN_TTL = timedelta(days=int(os.environ.get('AUTH_TOKEN_TTL_DAYS', 30)))
+# Sliding renewal pushes expiry forward at most once per interval per token.
+AUTH_TOKEN_RENEW_INTERVAL = timedelta(hours=1)
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 30))
+# Name of a Django cache shared between processes, e.g. 'default'.
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+
+# Directory shared by the worker processes of a host, cleared on deploy.
+# Unset, /metrics reports only the process serving the scrape.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+# Bearer token scrapers of /metrics send; unset, only METRICS_ALLOWED_IPS may scrape.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+# Addresses allowed to scrape /metrics without the token, as comma separated IPs.
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    if ip.strip()
+]
+
+# Fraction of requests traced, from 0 (off) to 1.
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0))
+TRACE_DIR = os.environ.get('TRACE_DIR', '/vol/web/traces')
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', 10 * 1024 * 1024))
+TRACE_BACKUP_COUNT = int(os.environ.get('TRACE_BACKUP_COUNT', 5))
+TRACE_MAX_SPANS = int(os.environ.get('TRACE_MAX_SPANS', 1000))
+
+# Seconds between stack samples of ?profile=sampling requests.
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+# Fraction of requests checked for repeated queries, from 0 (off) to 1.
+QUERY_REPEATS_SAMPLE_RATE = float(
+    os.environ.get('QUERY_REPEATS_SAMPLE_RATE', 1 if DEBUG else 0)
+)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+# Slow queries waiting to be saved; more are dropped.
+SLOW_QUERY_QUEUE_SIZE = int(os.environ.get('SLOW_QUERY_QUEUE_SIZE', 1000))
+SLOW_QUERY_PARAMS_LENGTH = 500
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
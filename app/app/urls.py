@@ -24,13 +24,43 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.admin import (
+    profile_download_view,
+    profile_list_view,
+    trace_detail_view,
+    trace_list_view,
+)
+from core.views import BatchView, metrics_view
+
 urlpatterns = [
+    path(
+        'admin/traces/',
+        admin.site.admin_view(trace_list_view),
+        name='admin-traces',
+    ),
+    path(
+        'admin/traces/<str:trace_id>/',
+        admin.site.admin_view(trace_detail_view),
+        name='admin-trace-detail',
+    ),
+    path(
+        'admin/profiles/',
+        admin.site.admin_view(profile_list_view),
+        name='admin-profiles',
+    ),
+    path(
+        'admin/profiles/<str:name>/',
+        admin.site.admin_view(profile_download_view),
+        name='admin-profile-download',
+    ),
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='api-schema'), name='api-docs'),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
     path('api/messaging/', include('messaging.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
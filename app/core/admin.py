@@ -5,9 +5,16 @@ Django admin customization.
 """
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
 from django.utils.translation import gettext_lazy as _
 
-from core import models
+from core import models, profiling, tracing
+
+# Number of traces listed on the slowest traces page.
+SLOWEST_TRACES = 50
+# Number of profiles listed on the recent profiles page.
+RECENT_PROFILES = 50
 
 
 class UserAdmin(BaseUserAdmin):
@@ -74,6 +81,42 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
 
 
+class DeviceTokenAdmin(admin.ModelAdmin):
+    """Admin view for DeviceToken."""
+    list_display = ['user', 'device', 'created', 'expires_at']
+    search_fields = ['user__email', 'device']
+    readonly_fields = ['key', 'created']
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Admin view for SlowQuery, costliest first."""
+    list_display = [
+        'fingerprint_preview', 'view', 'database', 'calls', 'total_time',
+        'mean_time', 'max_time', 'last_seen',
+    ]
+    list_filter = ['database', 'view']
+    search_fields = ['fingerprint', 'view']
+    ordering = ['-total_time']
+    readonly_fields = [
+        'fingerprint', 'database', 'view', 'sql', 'params', 'plan', 'calls',
+        'total_time', 'max_time', 'first_seen', 'last_seen',
+    ]
+
+    @admin.display(description=_('Query'))
+    def fingerprint_preview(self, obj):
+        return obj.fingerprint[:120]
+
+    @admin.display(description=_('Mean time'))
+    def mean_time(self, obj):
+        return round(obj.mean_time, 1)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe, RecipeAdmin)
 admin.site.register(models.Tag)
@@ -81,3 +124,47 @@ admin.site.register(models.Ingredient)
 admin.site.register(models.Rating, RatingAdmin)
 admin.site.register(models.Follow, FollowAdmin)
 admin.site.register(models.Comment, CommentAdmin)
+admin.site.register(models.DeviceToken, DeviceTokenAdmin)
+admin.site.register(models.SlowQuery, SlowQueryAdmin)
+
+
+def trace_list_view(request):
+    """List the slowest recorded request traces."""
+    context = {
+        **admin.site.each_context(request),
+        'title': _('Slowest traces'),
+        'traces': tracing.slowest_traces(SLOWEST_TRACES),
+    }
+    return TemplateResponse(request, 'admin/core/trace_list.html', context)
+
+
+def trace_detail_view(request, trace_id):
+    """Show the spans of one request trace."""
+    trace = tracing.find_trace(trace_id)
+    if trace is None:
+        raise Http404
+    context = {
+        **admin.site.each_context(request),
+        'title': f"{trace['method']} {trace['path']}",
+        'trace': trace,
+        'spans': tracing.span_tree(trace),
+    }
+    return TemplateResponse(request, 'admin/core/trace_detail.html', context)
+
+
+def profile_list_view(request):
+    """List recently saved request profiles."""
+    context = {
+        **admin.site.each_context(request),
+        'title': _('Recent profiles'),
+        'profiles': profiling.recent_profiles(RECENT_PROFILES),
+    }
+    return TemplateResponse(request, 'admin/core/profile_list.html', context)
+
+
+def profile_download_view(request, name):
+    """Download a saved request profile."""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
@@ -0,0 +1,168 @@
+"""
+Token authentication with a process-local and optional shared cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.models import DeviceToken
+from core.routers import bind_user
+from core.tracing import traced
+
+
+class TokenCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def _shared_cache():
+    if settings.TOKEN_CACHE_ALIAS is None:
+        return None
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+# User fields kept in the caches; others, e.g. the password hash, are
+# deferred and loaded from the database if a view needs them.
+USER_CACHE_FIELDS = ('id', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _shared_key(key):
+    return f'auth-token:v2:{key}'
+
+
+def _freeze(instance, names=None):
+    """Return a picklable snapshot of an instance's concrete fields.
+
+    Only the fields in names are kept, if given.
+    """
+    names = [
+        f.attname for f in instance._meta.concrete_fields
+        if names is None or f.attname in names
+    ]
+    values = tuple(getattr(instance, name) for name in names)
+    return instance._state.db, tuple(names), values
+
+
+def _thaw(model, snapshot):
+    """Build a fresh, unshared model instance from a snapshot."""
+    db, names, values = snapshot
+    return model.from_db(db, names, values)
+
+
+def invalidate_token(key):
+    """Drop a token from the local and shared caches."""
+    token_cache.delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(key))
+
+
+def _cache_entry(key, entry):
+    token_cache.set(key, entry)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_shared_key(key), entry, settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that caches the token and user lookup.
+
+    Tokens are expiring ``DeviceToken`` rows. Expiry is checked against the
+    cached snapshot and renewed (sliding) at most once per
+    ``AUTH_TOKEN_RENEW_INTERVAL``, refreshing the cached entry.
+
+    Entries live in a per-process LRU for ``TOKEN_CACHE_TTL`` seconds and,
+    when ``TOKEN_CACHE_ALIAS`` names a Django cache, in that shared cache.
+    Signal handlers in ``core.signals`` invalidate them when a token is
+    deleted or its user is saved; other processes' local entries expire
+    with the TTL.
+    """
+
+    model = DeviceToken
+
+    @traced('authenticate')
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            shared = _shared_cache()
+            if shared is not None:
+                entry = shared.get(_shared_key(key))
+                if entry is not None:
+                    token_cache.set(key, entry)
+            if entry is None:
+                entry = self._load(key)
+                _cache_entry(key, entry)
+
+        token_snapshot, user_snapshot = entry
+        token = _thaw(self.get_model(), token_snapshot)
+        user_model = token._meta.get_field('user').related_model
+        token.user = _thaw(user_model, user_snapshot)
+
+        now = timezone.now()
+        if token.expires_at <= now:
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        ttl = settings.AUTH_TOKEN_TTL
+        if token.expires_at < now + ttl - settings.AUTH_TOKEN_RENEW_INTERVAL:
+            token.expires_at = now + settings.AUTH_TOKEN_TTL
+            self.get_model().objects.filter(pk=token.pk).update(
+                expires_at=token.expires_at
+            )
+            _cache_entry(key, (_freeze(token), user_snapshot))
+        bind_user(token.user.pk)
+        return (token.user, token)
+
+    def _load(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return (_freeze(token), _freeze(token.user, USER_CACHE_FIELDS))
@@ -0,0 +1,244 @@
+"""
+Bounded, thread-safe pool of DB-API connections.
+
+Pools are shared process-wide through ``shared_pool``. A process forked
+from one using pools starts with none of its own, so parent and child never
+hand out the same socket.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Hand out at most ``max_size`` connections made by ``connect``.
+
+    Idle connections are reused most recently released first. A connection
+    is recycled once older than ``max_lifetime`` seconds, and health checked
+    with ``check`` before reuse when idle for over ``health_check_interval``
+    seconds. ``reset`` runs on release and may raise to discard the
+    connection. Callers wait up to ``timeout`` seconds for a connection.
+    """
+
+    def __init__(self, connect, max_size, timeout, max_lifetime,
+                 health_check_interval, check=None, reset=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.check = check
+        self.reset = reset
+        # (connection, created, last released) tuples.
+        self._idle = deque()
+        # id(connection) -> created, for connections handed out.
+        self._in_use = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+        }
+
+    def acquire(self):
+        """Return a healthy connection, waiting for one if the pool is full."""
+        while True:
+            entry = self._checkout()
+            if entry is None:
+                return self._open()
+            connection, created, released = entry
+            now = time.monotonic()
+            if now - created > self.max_lifetime:
+                self._discard(connection, 'connections_recycled')
+                continue
+            if (self.check is not None
+                    and now - released > self.health_check_interval
+                    and not self._healthy(connection)):
+                self._discard(connection, 'health_check_failures')
+                continue
+            with self._cond:
+                self._in_use[id(connection)] = created
+            return connection
+
+    def release(self, connection):
+        """Return a connection handed out by ``acquire`` to the pool."""
+        with self._cond:
+            created = self._in_use.pop(id(connection))
+        if time.monotonic() - created > self.max_lifetime:
+            self._discard(connection, 'connections_recycled')
+            return
+        if self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                logger.warning(
+                    'Discarding connection that failed to reset.',
+                    exc_info=True,
+                )
+                self._discard(connection)
+                return
+        with self._cond:
+            self._idle.append((connection, created, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, connection):
+        """Close a connection from ``acquire`` instead of reusing it."""
+        with self._cond:
+            self._in_use.pop(id(connection))
+        self._discard(connection)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+        for connection, _, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Return pool size, usage and wait metrics."""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                **self._stats,
+            }
+
+    def _checkout(self):
+        """Take an idle entry, or reserve a slot for a new one (None)."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            try:
+                while True:
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        logger.warning(
+                            'No database connection free after %.1fs'
+                            ' (pool size %d).',
+                            self.timeout, self.max_size,
+                        )
+                        raise PoolTimeout(
+                            f'No connection available within {self.timeout}s.'
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+            finally:
+                if waited:
+                    elapsed = time.monotonic() - start
+                    self._stats['waits'] += 1
+                    self._stats['wait_time_total'] += elapsed
+                    self._stats['wait_time_max'] = max(
+                        self._stats['wait_time_max'], elapsed
+                    )
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['connections_created'] += 1
+            self._in_use[id(connection)] = time.monotonic()
+        return connection
+
+    def _healthy(self, connection):
+        try:
+            self.check(connection)
+        except Exception:
+            logger.warning(
+                'Discarding connection that failed its health check.',
+                exc_info=True,
+            )
+            return False
+        return True
+
+    def _discard(self, connection, reason=None):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            if reason is not None:
+                self._stats[reason] += 1
+            self._size -= 1
+            self._cond.notify()
+
+
+# Pools of this process keyed by (name, key), and pools inherited over fork().
+_pools = {}
+_pools_lock = threading.Lock()
+_inherited = []
+
+
+def shared_pool(name, key, factory):
+    """Return this process's pool for (name, key), made by factory() if new."""
+    with _pools_lock:
+        pool = _pools.get((name, key))
+        if pool is None:
+            pool = _pools[(name, key)] = factory()
+    return pool
+
+
+def pool_stats():
+    """Return the stats of this process's pools, summed by name."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    totals = {}
+    for (name, _), pool in pools:
+        stats = totals.setdefault(name, {})
+        for stat, value in pool.stats().items():
+            if stat == 'wait_time_max':
+                stats[stat] = max(stats.get(stat, 0.0), value)
+            else:
+                stats[stat] = stats.get(stat, 0) + value
+    return totals
+
+
+@atexit.register
+def close_pools():
+    """Close the idle connections of every pool in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def _forget_pools():
+    """Drop the pools inherited by a forked child without closing them.
+
+    The parent still uses their connections; closing them here would end
+    its sessions too, so they stay referenced but are never handed out.
+    """
+    global _pools_lock
+    _inherited.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_pools)
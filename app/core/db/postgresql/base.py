@@ -0,0 +1,102 @@
+"""
+PostgreSQL backend drawing connections from a per-process pool.
+
+Configure with ``'ENGINE': 'core.db.postgresql'`` and an optional ``POOL``
+dict (``MAX_SIZE``, ``TIMEOUT``, ``MAX_LIFETIME``, ``HEALTH_CHECK_INTERVAL``)
+in the database settings. Keep ``CONN_MAX_AGE`` at 0 so Django hands the
+connection back to the pool at the end of every request. Connections to
+test databases are not pooled.
+"""
+import functools
+
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg2 import extensions, extras
+
+from core.db.pool import ConnectionPool, PoolTimeout, shared_pool
+from core.db.postgresql.creation import DatabaseCreation, test_aliases
+
+Database = base.Database
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 20,
+    'TIMEOUT': 10,
+    'MAX_LIFETIME': 1800,
+    'HEALTH_CHECK_INTERVAL': 30,
+}
+
+
+def _connect(conn_params, isolation_level):
+    """Open a connection set up as Django's backend sets up its own."""
+    connection = Database.connect(**conn_params)
+    if (isolation_level is not None
+            and isolation_level != connection.isolation_level):
+        connection.set_session(isolation_level=isolation_level)
+    extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+def _check(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def _reset(connection):
+    if connection.closed:
+        raise Database.InterfaceError('connection already closed')
+    status = connection.info.transaction_status
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL DatabaseWrapper whose connections come from a pool."""
+    creation_class = DatabaseCreation
+
+    # Pool the current connection came from, None if not pooled.
+    _pool = None
+
+    def get_pool(self, conn_params):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        connect = functools.partial(
+            _connect, conn_params,
+            self.settings_dict['OPTIONS'].get('isolation_level'),
+        )
+        # Keyed by parameters too, as test setup renames the database.
+        key = tuple(sorted(conn_params.items(), key=lambda item: item[0]))
+        return shared_pool(self.alias, key, lambda: ConnectionPool(
+            connect,
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            max_lifetime=options['MAX_LIFETIME'],
+            health_check_interval=options['HEALTH_CHECK_INTERVAL'],
+            check=_check,
+            reset=_reset,
+        ))
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        if self.alias in test_aliases:
+            self._pool = None
+            return super().get_new_connection(conn_params)
+        self._pool = self.get_pool(conn_params)
+        try:
+            connection = self._pool.acquire()
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc)) from exc
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self._pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps referencing the connection until rollback.
+                self._pool.discard(self.connection)
+            else:
+                self._pool.release(self.connection)
@@ -0,0 +1,35 @@
+"""
+Test database creation for the pooled PostgreSQL backend.
+"""
+from django.db.backends.postgresql import creation
+
+# Aliases whose connections bypass the pool because they use a test database.
+test_aliases = set()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Stop pooling connections to test databases.
+
+    An idle pooled connection to the test database would make PostgreSQL
+    refuse to clone or drop it, so while a test database is in use its
+    connections are closed for real.
+    """
+
+    def create_test_db(self, *args, **kwargs):
+        test_aliases.add(self.connection.alias)
+        return super().create_test_db(*args, **kwargs)
+
+    def set_as_test_mirror(self, primary_settings_dict):
+        test_aliases.add(self.connection.alias)
+        super().set_as_test_mirror(primary_settings_dict)
+
+    def destroy_test_db(self, old_database_name=None, verbosity=1,
+                        keepdb=False, suffix=None):
+        try:
+            super().destroy_test_db(
+                old_database_name, verbosity, keepdb, suffix,
+            )
+        finally:
+            # Clones of a parallel run are destroyed before the database.
+            if suffix is None:
+                test_aliases.discard(self.connection.alias)
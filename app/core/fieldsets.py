@@ -0,0 +1,96 @@
+"""
+Sparse fieldsets: ``?fields=`` and ``?omit=`` for serializers and querysets.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+SPARSE_ACTIONS = ('list', 'retrieve')
+
+
+def parse_fieldset(query_params):
+    """Return the requested (fields, omit) name sets from query params."""
+    def names(param):
+        value = query_params.get(param, '')
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    return names('fields'), names('omit')
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin dropping fields left out by ``?fields=``/``?omit=``.
+
+    ``field_dependencies`` maps a serializer field to the model fields or
+    relations it reads, for fields whose ``source`` does not say so.
+    """
+    field_dependencies = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        fields, omit = parse_fieldset(request.query_params)
+        for name in list(self.fields):
+            if (fields and name not in fields) or name in omit:
+                self.fields.pop(name)
+
+    def get_model_dependencies(self):
+        """Return the model field names the remaining fields read."""
+        names = set()
+        for name, field in self.fields.items():
+            if name in self.field_dependencies:
+                names.update(self.field_dependencies[name])
+            else:
+                names.add(field.source.split('.')[0])
+        return names
+
+
+def prune_queryset(queryset, serializer):
+    """Restrict queryset loading to what the serializer will render.
+
+    Concrete columns go to ``only()``, many-to-many relations are prefetched
+    and rendered foreign keys are joined; omitted relations are never loaded.
+    """
+    names = serializer.get_model_dependencies()
+    if '*' in names:
+        return queryset
+
+    opts = queryset.model._meta
+    only, prefetch, select = {opts.pk.name}, [], []
+    for name in names:
+        try:
+            model_field = opts.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if model_field.many_to_many and not model_field.auto_created:
+            prefetch.append(name)
+        elif model_field.many_to_one or model_field.one_to_one:
+            only.add(name)
+            rendered = serializer.fields.get(name)
+            if rendered is not None and not isinstance(
+                rendered, serializers.PrimaryKeyRelatedField
+            ):
+                select.append(name)
+        elif model_field.concrete:
+            only.add(name)
+
+    queryset = queryset.only(*only)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class SparseFieldsetViewMixin:
+    """View mixin pruning the queryset to the requested sparse fieldset."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) not in SPARSE_ACTIONS:
+            return queryset
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsetMixin):
+            return queryset
+        return prune_queryset(queryset, serializer)
@@ -0,0 +1,141 @@
+"""
+Password hashing on a bounded, dedicated thread pool for async views.
+
+The async login and signup views in ``user.async_views`` await digests here,
+so neither the event loop nor the shared sync thread is held while PBKDF2
+runs. Sync callers (the DRF views, the admin, management commands) hash
+inline through ``TimedPBKDF2PasswordHasher``, which only records the time.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent on password hashing during the current request.
+hashing_time = contextvars.ContextVar('hashing_time', default=0.0)
+
+
+class HashingUnavailable(Exception):
+    """Raised when the hashing pool is saturated."""
+
+    def __init__(self, message='Too many sign-in attempts in progress, '
+                               'try again shortly.'):
+        super().__init__(message)
+
+
+class HashingPool:
+    """Thread pool running at most ``max_workers`` hashes with a bounded queue.
+
+    Submissions beyond ``max_workers + max_pending`` in flight fail fast with
+    ``HashingUnavailable`` instead of queueing behind other requests.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='password-hash'
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingUnavailable()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, func, *args):
+        """Await func in the pool and record the time spent."""
+        start = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(self.submit(func, *args))
+        finally:
+            hashing_time.set(hashing_time.get() + time.perf_counter() - start)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide hashing pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    settings.PASSWORD_HASH_WORKERS,
+                    settings.PASSWORD_HASH_MAX_PENDING,
+                )
+    return _pool
+
+
+async def make_password(password):
+    """Return the hash of password, computed on the pool."""
+    return await get_pool().run(hashers.make_password, password)
+
+
+async def check_password(password, encoded):
+    """Return whether password matches encoded, checked on the pool.
+
+    A missing hash (unknown user) still costs one digest, so response times
+    do not reveal which accounts exist.
+    """
+    if encoded is None:
+        await make_password(password)
+        return False
+    return await get_pool().run(hashers.check_password, password, encoded)
+
+
+class TimedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher adding inline hashing to the request's hashing time.
+
+    Uses the same algorithm name as Django's hasher, so existing password
+    hashes keep verifying without an upgrade.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        start = time.perf_counter()
+        try:
+            return super().encode(password, salt, iterations)
+        finally:
+            hashing_time.set(hashing_time.get() + time.perf_counter() - start)
+
+
+def report_hashing_time(request, response):
+    """Add the request's hashing time as a ``Server-Timing: hash`` header."""
+    elapsed = hashing_time.get()
+    if elapsed:
+        response['Server-Timing'] = f'hash;dur={elapsed * 1000:.1f}'
+        logger.info(
+            'Password hashing took %.1f ms for %s %s',
+            elapsed * 1000, request.method, request.path,
+        )
+    return response
+
+
+class HashingTimingMixin:
+    """View mixin reporting password hashing time for the request.
+
+    Adds a ``Server-Timing: hash;dur=<ms>`` header and logs the duration.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        hashing_time.set(0.0)
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        return report_hashing_time(request, response)
@@ -0,0 +1,221 @@
+"""
+Django command to explain the API's hot queries and suggest missing indexes.
+"""
+import json
+import re
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.models import Recipe, Tag, Ingredient, Comment
+from messaging.models import Conversation, Message
+
+# A hot query path and a function building its queryset.
+CanonicalQuery = namedtuple('CanonicalQuery', 'name build')
+
+
+def first_id(model):
+    ids = model.objects.order_by('pk').values_list('pk', flat=True)
+    return ids.first() or 0
+
+
+def canonical_queries():
+    """Return the queries behind the API's hot endpoints, using sample IDs."""
+    user_id = first_id(get_user_model())
+    tag_id = first_id(Tag)
+    ingredient_id = first_id(Ingredient)
+    conversation_id = first_id(Conversation)
+    return [
+        CanonicalQuery(
+            'recipe list by tag',
+            lambda: Recipe.objects.filter(
+                tags__id__in=[tag_id]
+            ).order_by('-id').distinct(),
+        ),
+        CanonicalQuery(
+            'recipe list by ingredient',
+            lambda: Recipe.objects.filter(
+                ingredients__id__in=[ingredient_id]
+            ).order_by('-id').distinct(),
+        ),
+        CanonicalQuery(
+            'comments by user',
+            lambda: Comment.objects.filter(
+                user_id=user_id
+            ).order_by('-created_at'),
+        ),
+        CanonicalQuery(
+            'messages in conversation',
+            lambda: Message.objects.filter(
+                conversation_id=conversation_id
+            ).order_by('timestamp'),
+        ),
+        CanonicalQuery(
+            'conversations of participant',
+            lambda: Conversation.participants.through.objects.filter(
+                user_id=user_id
+            ).values('conversation_id'),
+        ),
+    ]
+
+
+def walk(plan, parent=None):
+    """Yield (node, parent node) for every node of plan."""
+    yield plan, parent
+    for child in plan.get('Plans', []):
+        yield from walk(child, plan)
+
+
+def postgresql_plan(queryset):
+    """Return the root node of the analyzed JSON plan of queryset."""
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            f'EXPLAIN (FORMAT JSON, ANALYZE, BUFFERS) {sql}', params
+        )
+        output = cursor.fetchone()[0]
+    # psycopg2 decodes the json column, other drivers may return text.
+    if isinstance(output, str):
+        output = json.loads(output)
+    return output[0]['Plan']
+
+
+def postgresql_issues(plan):
+    """Return seq scans and sorts in plan."""
+    issues = []
+    for node, _ in walk(plan):
+        buffers = (
+            node.get('Shared Hit Blocks', 0)
+            + node.get('Shared Read Blocks', 0)
+        )
+        if node['Node Type'] == 'Seq Scan':
+            issues.append(
+                f"Seq Scan on {node['Relation Name']}"
+                f" (filter: {node.get('Filter', '-')},"
+                f" rows removed: {node.get('Rows Removed by Filter', 0)},"
+                f' buffers: {buffers})'
+            )
+        elif node['Node Type'] == 'Sort':
+            issues.append(
+                f"Sort on {', '.join(node.get('Sort Key', []))}"
+                f" ({node.get('Sort Method', '-')}, buffers: {buffers})"
+            )
+    return issues
+
+
+def referenced_columns(connection, table, expression):
+    """Return the columns of table named in expression, in order of use."""
+    introspection = connection.introspection
+    with connection.cursor() as cursor:
+        columns = [
+            column.name
+            for column in introspection.get_table_description(cursor, table)
+        ]
+    positions = {}
+    for column in columns:
+        match = re.search(rf'\b{re.escape(column)}\b', expression)
+        if match:
+            positions[column] = match.start()
+    return sorted(positions, key=positions.get)
+
+
+def postgresql_suggestions(connection, plan):
+    """Return indexes for the filtered seq scans in plan.
+
+    Each suggestion indexes the columns of the scan's filter, followed by
+    those of a sort directly above it, unless an index already leads with
+    the first filter column (the planner may prefer a seq scan on a small
+    table).
+    """
+    suggestions = []
+    for node, parent in walk(plan):
+        if node['Node Type'] != 'Seq Scan' or 'Filter' not in node:
+            continue
+        table = node['Relation Name']
+        filtered = referenced_columns(connection, table, node['Filter'])
+        if not filtered or has_index(connection, table, filtered[:1]):
+            continue
+        columns = filtered
+        if parent is not None and parent['Node Type'] == 'Sort':
+            sort_key = ' '.join(parent.get('Sort Key', []))
+            sorted_by = referenced_columns(connection, table, sort_key)
+            columns = filtered + [
+                column for column in sorted_by if column not in filtered
+            ]
+        suggestions.append(f'CREATE INDEX ON {table} ({", ".join(columns)});')
+    return suggestions
+
+
+def sqlite_issues(queryset):
+    """Return full scans and temporary sorts in the query plan of queryset."""
+    issues = []
+    for line in queryset.explain().splitlines():
+        detail = line.split(maxsplit=3)[-1]
+        full_scan = detail.startswith('SCAN') and 'USING' not in detail
+        if full_scan or 'TEMP B-TREE' in detail:
+            issues.append(detail)
+    return issues
+
+
+def has_index(connection, table, columns):
+    """Return whether an index on table starts with columns."""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return any(
+        (constraint['index'] or constraint['unique'])
+        and constraint['columns'][:len(columns)] == columns
+        for constraint in constraints.values()
+    )
+
+
+class Command(BaseCommand):
+    """Explain the hot query paths and flag seq scans and sorts.
+
+    Indexes are suggested from the filters of sequential scans, which only
+    PostgreSQL's plans name.
+    """
+    help = (
+        'Run the API\'s canonical queries under EXPLAIN (ANALYZE, BUFFERS), '
+        'flag sequential scans and sorts, and suggest indexes for filtered '
+        'sequential scans.'
+    )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        suggestions = []
+        for query in canonical_queries():
+            queryset = query.build()
+            connection = connections[queryset.db]
+            if connection.vendor == 'postgresql':
+                plan = postgresql_plan(queryset)
+                issues = postgresql_issues(plan)
+                suggestions += [
+                    suggestion
+                    for suggestion in postgresql_suggestions(connection, plan)
+                    if suggestion not in suggestions
+                ]
+            elif connection.vendor == 'sqlite':
+                issues = sqlite_issues(queryset)
+            else:
+                self.stdout.write(
+                    f'{query.name}: EXPLAIN not supported'
+                    f' on {connection.vendor}.'
+                )
+                continue
+
+            self.stdout.write(f'{query.name}:')
+            for issue in issues:
+                self.stdout.write(self.style.WARNING(f'  {issue}'))
+            if not issues:
+                self.stdout.write('  no seq scans or sorts')
+
+        if suggestions:
+            self.stdout.write('Suggested indexes:')
+            for suggestion in suggestions:
+                self.stdout.write(f'  {suggestion}')
+        else:
+            self.stdout.write(
+                self.style.SUCCESS('All hot query paths are indexed.')
+            )
@@ -0,0 +1,59 @@
+"""
+Django command to delete expired and legacy auth tokens in small batches.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import DeviceToken
+
+
+class Command(BaseCommand):
+    """Delete expired tokens in primary key range batches.
+
+    Also empties the legacy ``authtoken_token`` table, whose tokens were
+    copied to device tokens by migration 0013 and are no longer accepted.
+    """
+    help = 'Delete expired and legacy auth tokens.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Width of each primary key range deleted per statement.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.05,
+            help='Seconds to pause between batches.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired = DeviceToken.objects.filter(expires_at__lte=timezone.now())
+        bounds = expired.aggregate(low=Min('id'), high=Max('id'))
+        deleted = 0
+        start = bounds['low']
+        while start is not None and start <= bounds['high']:
+            end = start + options['batch_size']
+            count, _ = expired.filter(id__gte=start, id__lt=end).delete()
+            deleted += count
+            start = end
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        legacy = 0
+        while True:
+            pks = Token.objects.values_list('pk', flat=True)
+            keys = list(pks[:options['batch_size']])
+            if not keys:
+                break
+            count, _ = Token.objects.filter(pk__in=keys).delete()
+            legacy += count
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired tokens and {legacy} legacy tokens.'
+        ))
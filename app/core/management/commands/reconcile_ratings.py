@@ -0,0 +1,36 @@
+"""
+Django command to recompute recipe rating summaries that drifted.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+
+from core.models import RATING_SCORES, Recipe
+
+
+class Command(BaseCommand):
+    """Recompute the rating histogram and average of stale recipes.
+
+    Deletes keep the summaries current through signals, but queryset
+    ``update()`` calls on ratings bypass them.
+    """
+    help = 'Recompute rating summaries not matching the recipes\' ratings.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        counts = {'actual_count': Count('ratings')}
+        stale = ~Q(ratings_count=F('actual_count'))
+        for score in RATING_SCORES:
+            counts[f'actual_{score}'] = Count(
+                'ratings', filter=Q(ratings__score=score),
+            )
+            stale |= ~Q(**{f'rating_{score}_count': F(f'actual_{score}')})
+        stale_ids = list(
+            Recipe.objects.annotate(**counts).filter(stale)
+            .values_list('id', flat=True)
+        )
+        for recipe in Recipe.objects.filter(id__in=stale_ids).iterator():
+            recipe.update_rating()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed ratings of {len(stale_ids)} recipes.'
+        ))
@@ -0,0 +1,177 @@
+"""
+Django command to move user buckets between recipe and message shards.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.db.models.functions import Mod
+
+from core.models import Recipe, Rating, Comment, ShardBucket
+from core.sharding import MAX_SHARDS, SHARD_BUCKETS, shard_map
+from messaging.models import Message
+
+# Models copied with a recipe, by the field pointing at it.
+RECIPE_CHILDREN = (
+    (Recipe.tags.through, 'recipe_id'),
+    (Recipe.ingredients.through, 'recipe_id'),
+    (Recipe.likes.through, 'recipe_id'),
+    (Rating, 'recipe_id'),
+    (Comment, 'recipe_id'),
+)
+SHARDED_TABLES = (Recipe, Message) + tuple(
+    model for model, _ in RECIPE_CHILDREN
+)
+
+
+def bucket_range(value):
+    """Parse a bucket ("7") or inclusive bucket range ("0-63")."""
+    low, _, high = value.partition('-')
+    buckets = range(int(low), int(high or low) + 1)
+    if not buckets or buckets[0] < 0 or buckets[-1] >= SHARD_BUCKETS:
+        raise ValueError(value)
+    return buckets
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def copy_rows(model, source, target, **filters):
+    """Copy rows matching filters from source to target, keeping their IDs."""
+    rows = list(
+        model._base_manager.using(source).filter(**filters).order_by('pk')
+    )
+    model._base_manager.using(target).bulk_create(rows)
+    return len(rows)
+
+
+class Command(BaseCommand):
+    """Move the recipes and messages of user buckets to another shard."""
+    help = (
+        'Move the recipes and messages of user buckets to another shard. '
+        'Stop writes for the moved users while it runs; other processes pick '
+        'up the new map within SHARD_MAP_TTL seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'buckets', nargs='*', type=bucket_range,
+            help=f'Buckets ("7") or ranges ("0-63") below {SHARD_BUCKETS}.',
+        )
+        parser.add_argument(
+            '--to', help='Alias of the shard to move the buckets to.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of recipes or messages copied per transaction.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would move without copying or deleting.',
+        )
+        parser.add_argument(
+            '--init-sequences', action='store_true',
+            help='Interleave ID sequences across shards (PostgreSQL only).',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['init_sequences']:
+            self._init_sequences()
+        if not options['buckets']:
+            return
+
+        target = options['to']
+        if target not in settings.DATABASE_SHARDS:
+            raise CommandError(
+                f'--to must be one of: {", ".join(settings.DATABASE_SHARDS)}.'
+            )
+        requested = {b for buckets in options['buckets'] for b in buckets}
+        for bucket in sorted(requested):
+            source = shard_map.shard_for_bucket(bucket)
+            if source == target:
+                continue
+            self._move(
+                bucket, source, target,
+                options['batch_size'], options['dry_run'],
+            )
+
+    def _move(self, bucket, source, target, batch_size, dry_run):
+        user_ids = list(
+            get_user_model().objects.using(DEFAULT_DB_ALIAS).annotate(
+                bucket=Mod('id', SHARD_BUCKETS),
+            ).filter(bucket=bucket).values_list('id', flat=True)
+        )
+        recipe_ids = list(
+            Recipe.objects.using(source).filter(user_id__in=user_ids)
+            .order_by('id').values_list('id', flat=True)
+        )
+        message_ids = list(
+            Message.objects.using(source).filter(sender_id__in=user_ids)
+            .order_by('id').values_list('id', flat=True)
+        )
+        if dry_run:
+            self.stdout.write(
+                f'Would move bucket {bucket} from {source} to {target}: '
+                f'{len(recipe_ids)} recipes, {len(message_ids)} messages.'
+            )
+            return
+
+        for batch in chunks(recipe_ids, batch_size):
+            with transaction.atomic(using=target):
+                copy_rows(Recipe, source, target, id__in=batch)
+                for model, field in RECIPE_CHILDREN:
+                    copy_rows(model, source, target, **{f'{field}__in': batch})
+        for batch in chunks(message_ids, batch_size):
+            with transaction.atomic(using=target):
+                copy_rows(Message, source, target, id__in=batch)
+
+        ShardBucket.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            bucket=bucket, defaults={'shard': target},
+        )
+        shard_map.invalidate()
+
+        for batch in chunks(recipe_ids, batch_size):
+            Recipe.objects.using(source).filter(id__in=batch).delete()
+        for batch in chunks(message_ids, batch_size):
+            Message.objects.using(source).filter(id__in=batch).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved bucket {bucket} from {source} to {target}: '
+            f'{len(recipe_ids)} recipes, {len(message_ids)} messages.'
+        ))
+
+    def _init_sequences(self):
+        """Make shard N allocate IDs congruent to N + 1 modulo MAX_SHARDS.
+
+        IDs stay unique across shards, so moved rows never collide.
+        """
+        shards = settings.DATABASE_SHARDS
+        if any(connections[alias].vendor != 'postgresql' for alias in shards):
+            raise CommandError('--init-sequences requires PostgreSQL shards.')
+
+        for model in SHARDED_TABLES:
+            table = model._meta.db_table
+            high = max(
+                model._base_manager.using(alias)
+                .aggregate(high=Max('pk'))['high'] or 0
+                for alias in shards
+            )
+            for index, alias in enumerate(shards):
+                start = (high // MAX_SHARDS + 1) * MAX_SHARDS + index + 1
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_get_serial_sequence(%s, 'id')", [table]
+                    )
+                    sequence = cursor.fetchone()[0]
+                    cursor.execute(
+                        f'ALTER SEQUENCE {sequence} INCREMENT BY {MAX_SHARDS}'
+                        f' RESTART WITH {start}'
+                    )
+        self.stdout.write(self.style.SUCCESS(
+            f'Interleaved ID sequences of {len(SHARDED_TABLES)} tables'
+            f' across {len(shards)} shards.'
+        ))
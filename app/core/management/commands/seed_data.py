@@ -0,0 +1,453 @@
+"""
+Django command to generate a large, realistic dataset for benchmarking.
+"""
+import io
+import math
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from core.models import Recipe, Tag, Ingredient, Rating, Follow
+from messaging.models import Conversation, Message
+
+# Jobs of a phase only reference rows loaded by earlier phases.
+PHASES = (
+    ('users',),
+    ('tags', 'ingredients', 'follows', 'conversations'),
+    ('recipes',),
+)
+# Models loaded with explicit IDs, whose sequences are reset afterwards.
+ID_MODELS = (get_user_model(), Tag, Ingredient, Recipe, Conversation)
+
+# Prime multiplier spreading popularity ranks over the ID range.
+SCATTER = 2654435761
+# Timestamps are offsets from a fixed time, so runs are reproducible.
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+RATING_WEIGHTS = (5, 7, 15, 33, 40)
+# Backslash escapes of COPY's text format.
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+FIRST_NAMES = (
+    'Ada', 'Ben', 'Chloe', 'Dev', 'Elena', 'Farid', 'Grace', 'Hugo', 'Ines',
+    'Jonas', 'Kemi', 'Liam', 'Maya', 'Noor', 'Oscar', 'Priya', 'Rosa', 'Sam',
+)
+LAST_NAMES = (
+    'Adams', 'Brown', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Haddad',
+    'Ito', 'Jensen', 'Kowalski', 'Lopez', 'Moreau', 'Novak', 'Okafor', 'Silva',
+)
+ADJECTIVES = (
+    'Spicy', 'Creamy', 'Smoky', 'Crispy', 'Zesty', 'Hearty', 'Quick', 'Rustic',
+    'Roasted', 'Grilled', 'Tangy', 'Sweet', 'Savory', 'Herby', 'Golden',
+)
+FOODS = (
+    'tomato', 'garlic', 'lentil', 'chickpea', 'mushroom', 'salmon', 'chicken',
+    'tofu', 'spinach', 'lemon', 'ginger', 'coconut', 'potato', 'pepper',
+    'basil', 'rice', 'noodle', 'bean', 'squash', 'apple', 'cheese', 'honey',
+)
+DISHES = (
+    'soup', 'curry', 'stew', 'salad', 'pasta', 'risotto', 'tacos', 'pie',
+    'bowl', 'stir fry', 'bake', 'skillet', 'sandwich', 'tart', 'pancakes',
+)
+TAG_WORDS = (
+    'vegan', 'vegetarian', 'gluten-free', 'dinner', 'lunch', 'breakfast',
+    'dessert', 'quick', 'budget', 'spicy', 'comfort', 'healthy', 'party',
+)
+MESSAGE_WORDS = (
+    'hey', 'did', 'you', 'try', 'the', 'recipe', 'it', 'was', 'great',
+    'thanks', 'love', 'this', 'too', 'much', 'salt', 'next', 'time',
+    'dinner', 'tonight',
+)
+
+
+def zipf_rank(rng, n, exponent):
+    """Return a rank in [0, n), r drawn with weight ~(r + 1) ** -exponent."""
+    u = rng.random()
+    if exponent == 1:
+        x = (n + 1) ** u
+    else:
+        x = (u * (n + 1) ** (1 - exponent) + 1 - u) ** (1 / (1 - exponent))
+    return min(int(x) - 1, n - 1)
+
+
+def harmonic(n, exponent):
+    """Approximate the sum of (r + 1) ** -exponent over ranks [0, n)."""
+    if exponent == 1:
+        return math.log((n + 0.5) / 0.5)
+    return (
+        ((n + 0.5) ** (1 - exponent) - 0.5 ** (1 - exponent))
+        / (1 - exponent)
+    )
+
+
+def scatter(rank, n):
+    return rank * SCATTER % n
+
+
+class Generator:
+    """Row generation shared by the jobs, for one seed and set of sizes."""
+
+    def __init__(self, ctx, rng):
+        self.ctx = ctx
+        self.rng = rng
+        self.exponent = ctx['zipf']
+
+    def pick(self, kind):
+        """Return the ID of a Zipf-popular row of kind."""
+        base, n = self.ctx['ranges'][kind]
+        return base + scatter(zipf_rank(self.rng, n, self.exponent), n)
+
+    def pick_distinct(self, kind, k, exclude=()):
+        base, n = self.ctx['ranges'][kind]
+        k = min(k, n - len(exclude))
+        picked = set()
+        for _ in range(k * 20):
+            if len(picked) >= k:
+                break
+            value = self.pick(kind)
+            if value not in exclude:
+                picked.add(value)
+        return sorted(picked)
+
+    def sample_users(self, k):
+        base, n = self.ctx['ranges']['users']
+        return [base + index for index in self.rng.sample(range(n), min(k, n))]
+
+    def share(self, total, kind, index):
+        """Return the number of total items going to a row by popularity."""
+        n = self.ctx['ranges'][kind][1]
+        rank = scatter(index, n)
+        expected = (
+            total * (rank + 1) ** -self.exponent
+            / harmonic(n, self.exponent)
+        )
+        return int(expected) + (self.rng.random() < expected % 1)
+
+    def moment(self, days=365):
+        return EPOCH + timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def users(self, start, stop):
+        base = self.ctx['ranges']['users'][0]
+        rows = [
+            (
+                base + index, self.ctx['password'], None, False,
+                f'user{base + index}@example.com',
+                f'{self.rng.choice(FIRST_NAMES)} '
+                f'{self.rng.choice(LAST_NAMES)}',
+                True, False,
+            )
+            for index in range(start, stop)
+        ]
+        columns = (
+            'id', 'password', 'last_login', 'is_superuser', 'email', 'name',
+            'is_active', 'is_staff',
+        )
+        return [(get_user_model(), columns, rows)]
+
+    def tags(self, start, stop):
+        base = self.ctx['ranges']['tags'][0]
+        rows = [
+            (
+                base + index, f'{self.rng.choice(TAG_WORDS)}-{base + index}',
+                self.pick('users'),
+            )
+            for index in range(start, stop)
+        ]
+        return [(Tag, ('id', 'name', 'user_id'), rows)]
+
+    def ingredients(self, start, stop):
+        base = self.ctx['ranges']['ingredients'][0]
+        rows = [
+            (
+                base + index, f'{self.rng.choice(FOODS)} {base + index}',
+                self.pick('users'),
+            )
+            for index in range(start, stop)
+        ]
+        return [(Ingredient, ('id', 'name', 'user_id'), rows)]
+
+    def follows(self, start, stop):
+        base, n = self.ctx['ranges']['users']
+        average = self.ctx['counts']['follows'] / n
+        rows = []
+        for index in range(start, stop):
+            follower = base + index
+            count = self.rng.randint(0, round(2 * average))
+            followees = self.pick_distinct('users', count, exclude={follower})
+            for followee in followees:
+                rows.append((follower, followee))
+        return [(Follow, ('follower_id', 'followee_id'), rows)]
+
+    def conversations(self, start, stop):
+        base = self.ctx['ranges']['conversations'][0]
+        conversations, participants, messages = [], [], []
+        for index in range(start, stop):
+            conversation_id = base + index
+            created_at = self.moment()
+            conversations.append((conversation_id, created_at))
+            size = 2 + (self.rng.random() < 0.2) * self.rng.randint(1, 3)
+            members = self.pick_distinct('users', size)
+            participants.extend(
+                (conversation_id, user_id) for user_id in members
+            )
+            sent_at = created_at
+            total = self.share(
+                self.ctx['counts']['messages'], 'conversations', index
+            )
+            for _ in range(total):
+                gap = int(self.rng.expovariate(1 / 3600)) + 1
+                sent_at += timedelta(seconds=gap)
+                words = self.rng.randint(3, 15)
+                content = ' '.join(self.rng.choices(MESSAGE_WORDS, k=words))
+                sender_id = self.rng.choice(members)
+                messages.append((conversation_id, sender_id, content, sent_at))
+        return [
+            (Conversation, ('id', 'created_at'), conversations),
+            (
+                Conversation.participants.through,
+                ('conversation_id', 'user_id'),
+                participants,
+            ),
+            (
+                Message,
+                ('conversation_id', 'sender_id', 'content', 'timestamp'),
+                messages,
+            ),
+        ]
+
+    def recipes(self, start, stop):
+        base = self.ctx['ranges']['recipes'][0]
+        counts = self.ctx['counts']
+        recipes, tags, ingredients, likes, ratings = [], [], [], [], []
+        for index in range(start, stop):
+            recipe_id = base + index
+            for tag_id in self.pick_distinct('tags', self.rng.randint(0, 4)):
+                tags.append((recipe_id, tag_id))
+            count = self.rng.randint(3, 10)
+            for ingredient_id in self.pick_distinct('ingredients', count):
+                ingredients.append((recipe_id, ingredient_id))
+            liked = self.share(counts['likes'], 'recipes', index)
+            for user_id in self.sample_users(liked):
+                likes.append((recipe_id, user_id))
+
+            histogram = [0] * len(RATING_WEIGHTS)
+            rated = self.share(counts['ratings'], 'recipes', index)
+            for user_id in self.sample_users(rated):
+                score = self.rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+                histogram[score - 1] += 1
+                ratings.append((user_id, recipe_id, score))
+            ratings_count = sum(histogram)
+            score_total = sum(
+                score * count for score, count in enumerate(histogram, 1)
+            )
+            average = score_total / ratings_count if ratings_count else 0
+            food = self.rng.choice(FOODS)
+            recipes.append((
+                recipe_id, self.pick('users'),
+                f'{self.rng.choice(ADJECTIVES)} {food} '
+                f'{self.rng.choice(DISHES)}',
+                f'A {food} recipe for {self.rng.randint(1, 8)}.',
+                self.rng.choice((10, 15, 20, 30, 45, 60, 90, 120)),
+                Decimal(self.rng.randrange(100, 5000)) / 100,
+                '', None, Decimal(f'{average:.2f}'), ratings_count, *histogram,
+            ))
+        return [
+            (Recipe, (
+                'id', 'user_id', 'title', 'description', 'time_minutes',
+                'price', 'link', 'image', 'average_rating', 'ratings_count',
+                'rating_1_count', 'rating_2_count', 'rating_3_count',
+                'rating_4_count', 'rating_5_count',
+            ), recipes),
+            (Recipe.tags.through, ('recipe_id', 'tag_id'), tags),
+            (
+                Recipe.ingredients.through, ('recipe_id', 'ingredient_id'),
+                ingredients,
+            ),
+            (Recipe.likes.through, ('recipe_id', 'user_id'), likes),
+            (Rating, ('user_id', 'recipe_id', 'score'), ratings),
+        ]
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).translate(COPY_ESCAPES)
+
+
+def load(connection, model, columns, rows):
+    """Insert rows with COPY on PostgreSQL, else with bulk_create."""
+    if not rows:
+        return
+    if connection.vendor != 'postgresql':
+        model._base_manager.using(connection.alias).bulk_create(
+            [model(**dict(zip(columns, row))) for row in rows],
+            batch_size=1000,
+        )
+        return
+    data = io.StringIO()
+    for row in rows:
+        data.write('\t'.join(map(_copy_value, row)))
+        data.write('\n')
+    data.seek(0)
+    quote = connection.ops.quote_name
+    column_names = ', '.join(
+        quote(model._meta.get_field(column).column) for column in columns
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY {quote(model._meta.db_table)} ({column_names}) FROM STDIN',
+            data,
+        )
+
+
+def run_job(job):
+    """Generate and load one chunk of rows; return row counts by table."""
+    kind, start, stop, ctx = job
+    rng = random.Random(f"{ctx['seed']}:{kind}:{start}")
+    tables = getattr(Generator(ctx, rng), kind)(start, stop)
+    alias = ctx['database']
+    with transaction.atomic(using=alias):
+        for model, columns, rows in tables:
+            load(connections[alias], model, columns, rows)
+    return {model._meta.db_table: len(rows) for model, columns, rows in tables}
+
+
+class Command(BaseCommand):
+    """Generate users, recipes, ratings, follows and messages."""
+    help = (
+        'Generate a large, realistic dataset with Zipf-distributed '
+        'popularity. The same seed, sizes and chunk size give the same data '
+        'on an empty database. Rows are loaded with COPY on PostgreSQL, in '
+        'parallel worker processes, and with bulk_create elsewhere.'
+    )
+
+    def add_arguments(self, parser):
+        sizes = (
+            ('users', 1000), ('recipes', 10000), ('tags', 200),
+            ('ingredients', 1000), ('likes', 50000), ('ratings', 30000),
+            ('follows', 20000), ('conversations', 2000), ('messages', 40000),
+        )
+        for name, default in sizes:
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Number of {name} to generate (default: {default}).',
+            )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Exponent of the Zipf popularity distribution '
+                 '(default: 1.1).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of worker processes (PostgreSQL only).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=20000,
+            help='Number of users, recipes, ... loaded per transaction.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to load into.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        alias = options['database']
+        connection = connections[alias]
+        if options['zipf'] <= 0:
+            raise CommandError('--zipf must be positive.')
+        related = options['follows'] or options['conversations']
+        if options['users'] < 2 and related:
+            raise CommandError(
+                'Follows and conversations need at least 2 users.'
+            )
+
+        sizes = {
+            'users': get_user_model(), 'tags': Tag, 'ingredients': Ingredient,
+            'recipes': Recipe, 'conversations': Conversation,
+        }
+        ranges = {}
+        for kind, model in sizes.items():
+            high = model._base_manager.using(alias).aggregate(
+                high=Max('id')
+            )['high']
+            ranges[kind] = ((high or 0) + 1, options[kind])
+        ctx = {
+            'seed': options['seed'],
+            'zipf': options['zipf'],
+            'database': alias,
+            'ranges': ranges,
+            'counts': {
+                name: options[name]
+                for name in ('likes', 'ratings', 'follows', 'messages')
+            },
+            'password': make_password('password'),
+        }
+        totals = {
+            'users': options['users'], 'tags': options['tags'],
+            'ingredients': options['ingredients'],
+            'recipes': options['recipes'],
+            'conversations': options['conversations'],
+            'follows': options['users'] if options['follows'] else 0,
+        }
+
+        postgresql = connection.vendor == 'postgresql'
+        workers = options['workers'] if postgresql else 1
+        chunk_size = options['chunk_size']
+        started = time.monotonic()
+        loaded = {}
+        for phase in PHASES:
+            jobs = [
+                (kind, start, min(start + chunk_size, totals[kind]), ctx)
+                for kind in phase
+                for start in range(0, totals[kind], chunk_size)
+            ]
+            for counts in self._run(jobs, workers):
+                for table, count in counts.items():
+                    loaded[table] = loaded.get(table, 0) + count
+
+        if postgresql:
+            reset = connection.ops.sequence_reset_sql(no_style(), ID_MODELS)
+            with connection.cursor() as cursor:
+                for sql in reset:
+                    cursor.execute(sql)
+
+        for table, count in loaded.items():
+            self.stdout.write(f'{table}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {sum(loaded.values())} rows'
+            f' in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def _run(self, jobs, workers):
+        if workers <= 1 or len(jobs) <= 1:
+            return [run_job(job) for job in jobs]
+        if any(connection.in_atomic_block for connection in connections.all()):
+            # Closing the connections would abort the caller's transaction.
+            raise CommandError(
+                'Cannot load in parallel inside a transaction; '
+                'use --workers 1.'
+            )
+        # Workers open their own connections rather than sharing forked ones
+        # (forked children also drop the inherited pools, see core.db.pool).
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            return list(executor.map(run_job, jobs))
@@ -0,0 +1,367 @@
+"""
+Request metrics in the Prometheus text format, aggregated across processes.
+
+Each process keeps its metrics in memory. When ``METRICS_DIR`` is set, a
+background thread writes them to the process's own file there every
+``METRICS_FLUSH_INTERVAL`` seconds, and ``/metrics`` sums the files of
+every process sharing the directory. The files of exited processes are
+folded into ``metrics-retired.json``. Database connection pool usage is
+reported alongside, per alias.
+
+Scrapers send ``Authorization: Bearer <METRICS_TOKEN>`` or connect from an
+address in ``METRICS_ALLOWED_IPS``.
+"""
+import atexit
+import fcntl
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from core.db.pool import pool_stats
+from core.middleware import request_hook
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by view, method and status.'),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency by view and method.'
+    ),
+    'http_request_db_seconds': (
+        'histogram', 'Database time per request by view.'
+    ),
+    'http_requests_in_flight': ('gauge', 'Requests being handled.'),
+    'db_pool_connections': ('gauge', 'Pooled database connections by state.'),
+    'db_pool_waits_total': (
+        'counter', 'Connection requests that waited for a free connection.'
+    ),
+    'db_pool_wait_seconds_total': (
+        'counter', 'Time spent waiting for a free connection.'
+    ),
+    'db_pool_timeouts_total': (
+        'counter', 'Connection requests that found no free connection.'
+    ),
+}
+
+
+class Registry:
+    """Metrics of this process, keyed by name and then by label pairs.
+
+    Histograms hold per-bucket (not cumulative) counts, the last one for
+    values above every bound, and the sum of observed values.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._metrics = {name: {} for name in METRICS}
+        self._version = 0
+        self._flushed_version = 0
+        self._flusher_pid = None
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            values = self._metrics[name]
+            values[labels] = values.get(labels, 0) + amount
+            self._version += 1
+        self._start_flusher()
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            histogram = self._metrics[name].get(labels)
+            if histogram is None:
+                histogram = [[0] * (len(BUCKETS) + 1), 0.0]
+                self._metrics[name][labels] = histogram
+            histogram[0][bisect_left(BUCKETS, value)] += 1
+            histogram[1] += value
+            self._version += 1
+        self._start_flusher()
+
+    def snapshot(self):
+        """Return the metrics as {name: [[label pairs, value], ...]}.
+
+        Database pool metrics are read from the pools at the time of the call.
+        """
+        def copy(value):
+            if isinstance(value, list):
+                return [list(value[0]), value[1]]
+            return value
+
+        with self._lock:
+            snapshot = {
+                name: [
+                    [list(labels), copy(value)]
+                    for labels, value in values.items()
+                ]
+                for name, values in self._metrics.items()
+            }
+        for name, values in _pool_metrics().items():
+            snapshot[name] = [
+                [list(labels), value] for labels, value in values.items()
+            ]
+        return snapshot
+
+    def flush(self, directory):
+        """Write the snapshot to this process's file in directory, if new."""
+        with self._flush_lock:
+            version = self._version
+            if version == self._flushed_version:
+                return
+            path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+            try:
+                data = {'pid': os.getpid(), 'metrics': self.snapshot()}
+                with open(f'{path}.tmp', 'w') as file:
+                    json.dump(data, file)
+                os.replace(f'{path}.tmp', path)
+            except OSError:
+                logger.warning(
+                    'Could not write metrics to %s', path, exc_info=True
+                )
+                return
+            self._flushed_version = version
+
+    def _start_flusher(self):
+        directory = settings.METRICS_DIR
+        # Checked by pid so forked workers start their own thread.
+        if not directory or self._flusher_pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(
+            target=self._flush_loop, args=(directory,),
+            name='metrics-flush', daemon=True,
+        ).start()
+        atexit.register(self.flush, directory)
+
+    def _flush_loop(self, directory):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush(directory)
+
+
+registry = Registry()
+
+
+def _pool_metrics():
+    """Return the database pool metrics of this process."""
+    metrics = {
+        'db_pool_connections': {},
+        'db_pool_waits_total': {},
+        'db_pool_wait_seconds_total': {},
+        'db_pool_timeouts_total': {},
+    }
+    for alias, stats in pool_stats().items():
+        labels = (('database', alias),)
+        connections = metrics['db_pool_connections']
+        connections[(*labels, ('state', 'idle'))] = stats['idle']
+        connections[(*labels, ('state', 'in_use'))] = stats['in_use']
+        metrics['db_pool_waits_total'][labels] = stats['waits']
+        wait_time = stats['wait_time_total']
+        metrics['db_pool_wait_seconds_total'][labels] = wait_time
+        metrics['db_pool_timeouts_total'][labels] = stats['timeouts']
+    return metrics
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(snapshots):
+    """Sum snapshots into {name: {labels: value}}.
+
+    Gauges of processes that have exited are dropped; their counters and
+    histograms are kept.
+    """
+    merged = {name: {} for name in METRICS}
+    for pid, snapshot in snapshots:
+        for name, values in snapshot.items():
+            kind = METRICS[name][0]
+            if kind == 'gauge' and pid is not None and not _alive(pid):
+                continue
+            for labels, value in values:
+                labels = tuple(tuple(pair) for pair in labels)
+                current = merged[name].get(labels)
+                if kind != 'histogram':
+                    merged[name][labels] = (current or 0) + value
+                elif current is None:
+                    merged[name][labels] = value
+                else:
+                    merged[name][labels] = [
+                        [a + b for a, b in zip(current[0], value[0])],
+                        current[1] + value[1],
+                    ]
+    return merged
+
+
+RETIRED_FILE = 'metrics-retired.json'
+
+
+def _read(path):
+    """Return (pid, snapshot) of a metrics file, or None if unreadable."""
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data['pid'], data['metrics']
+
+
+def _retire(directory, filenames):
+    """Fold the files of exited processes into ``RETIRED_FILE``.
+
+    Their counters and histograms are kept, their gauges dropped and their
+    files deleted. A lock file keeps concurrent scrapes from folding the
+    same file twice.
+    """
+    with open(os.path.join(directory, '.metrics.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired = _read(os.path.join(directory, RETIRED_FILE))
+        snapshots = [retired] if retired else []
+        paths = []
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            snapshot = _read(path)
+            # Gone if another process retired it meanwhile.
+            if snapshot is not None:
+                snapshots.append(snapshot)
+                paths.append(path)
+        if not paths:
+            return
+        merged = merge(snapshots)
+        data = {
+            'pid': None,
+            'metrics': {
+                name: [
+                    [list(labels), value] for labels, value in values.items()
+                ]
+                for name, values in merged.items()
+            },
+        }
+        path = os.path.join(directory, RETIRED_FILE)
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(data, file)
+        os.replace(f'{path}.tmp', path)
+        for path in paths:
+            os.remove(path)
+
+
+def collect():
+    """Return the merged metrics of every process sharing ``METRICS_DIR``."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return merge([(None, registry.snapshot())])
+    registry.flush(directory)
+    # This process's own file may predate changes to its pool metrics.
+    snapshots = [(os.getpid(), registry.snapshot())]
+    exited = []
+    for filename in os.listdir(directory):
+        if not filename.startswith('metrics-'):
+            continue
+        if not filename.endswith('.json'):
+            continue
+        if filename == f'metrics-{os.getpid()}.json':
+            continue
+        snapshot = _read(os.path.join(directory, filename))
+        if snapshot is None:
+            continue
+        if snapshot[0] is not None and not _alive(snapshot[0]):
+            exited.append(filename)
+        snapshots.append(snapshot)
+    if exited:
+        _retire(directory, exited)
+    return merge(snapshots)
+
+
+def scrape_allowed(request):
+    """Return whether request may read the metrics."""
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and header.startswith('Bearer '):
+        supplied = header[len('Bearer '):].encode()
+        if hmac.compare_digest(supplied, token.encode()):
+            return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def _escape(value):
+    value = str(value).replace('\\', r'\\')
+    return value.replace('"', r'\"').replace('\n', r'\n')
+
+
+def _series(name, labels, value, extra=()):
+    pairs = ','.join(
+        f'{key}="{_escape(label)}"' for key, label in (*labels, *extra)
+    )
+    return f'{name}{{{pairs}}} {value}' if pairs else f'{name} {value}'
+
+
+def render(metrics):
+    """Format merged metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(metrics[name].items()):
+            if kind != 'histogram':
+                lines.append(_series(name, labels, value))
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, '+Inf'), counts):
+                cumulative += count
+                lines.append(_series(
+                    f'{name}_bucket', labels, cumulative, [('le', bound)]
+                ))
+            lines.append(_series(f'{name}_sum', labels, total))
+            lines.append(_series(f'{name}_count', labels, cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+def _start():
+    registry.inc('http_requests_in_flight', ())
+    return time.perf_counter()
+
+
+def _finish(request, response, start):
+    elapsed = time.perf_counter() - start
+    registry.inc('http_requests_in_flight', (), -1)
+    match = request.resolver_match
+    view = match.view_name if match else 'unresolved'
+    method = ('method', request.method)
+    registry.inc(
+        'http_requests_total',
+        (method, ('status', str(response.status_code)), ('view', view)),
+    )
+    registry.observe(
+        'http_request_duration_seconds', (method, ('view', view)), elapsed,
+    )
+    stats = getattr(request, 'query_stats', None)
+    if stats is not None:
+        registry.observe(
+            'http_request_db_seconds', (('view', view),), stats.duration
+        )
+
+
+@request_hook
+def metrics_middleware(request):
+    """Record latency, status and database time by resolved view name."""
+    start = _start()
+    response = yield
+    _finish(request, response, start)
@@ -0,0 +1,62 @@
+"""
+Helper for middleware running the same code under WSGI and ASGI.
+"""
+import asyncio
+import functools
+
+from django.utils.decorators import sync_and_async_middleware
+
+
+def _resume(hook, response):
+    """Send the response to hook and let it finish."""
+    try:
+        hook.send(response)
+    except StopIteration:
+        return
+    raise RuntimeError(f'{hook.__name__} yielded more than once')
+
+
+def _fail(hook, exc):
+    """Raise exc inside hook at its yield; re-raised unless hook raises."""
+    try:
+        hook.throw(exc)
+    except StopIteration:
+        pass
+
+
+def request_hook(func):
+    """Turn generator function ``func(request)`` into a middleware factory.
+
+    ``func`` runs up to its single ``yield`` before the rest of the chain,
+    receives the response from the ``yield`` and may change it in place.
+    An exception from the rest of the chain is raised at the ``yield``, so
+    ``try``/``finally`` and context managers around it clean up either way.
+    Context variables set in ``func`` are visible to the rest of the chain.
+    """
+    @sync_and_async_middleware
+    @functools.wraps(func)
+    def factory(get_response):
+        if asyncio.iscoroutinefunction(get_response):
+            async def middleware(request):
+                hook = func(request)
+                next(hook)
+                try:
+                    response = await get_response(request)
+                except BaseException as exc:
+                    _fail(hook, exc)
+                    raise
+                _resume(hook, response)
+                return response
+        else:
+            def middleware(request):
+                hook = func(request)
+                next(hook)
+                try:
+                    response = get_response(request)
+                except BaseException as exc:
+                    _fail(hook, exc)
+                    raise
+                _resume(hook, response)
+                return response
+        return middleware
+    return factory
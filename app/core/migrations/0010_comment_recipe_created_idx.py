@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_auto_20240707_1629'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['recipe', '-created_at'], name='comment_recipe_created_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+PATH_STEP = 10
+
+
+def backfill_paths(apps, schema_editor):
+    """Give existing comments a top-level materialized path."""
+    Comment = apps.get_model('core', 'Comment')
+    comments = []
+    for comment in Comment.objects.only('id').iterator(chunk_size=2000):
+        comment.path = f'{comment.id:0{PATH_STEP}d}'
+        comments.append(comment)
+        if len(comments) == 2000:
+            Comment.objects.bulk_update(comments, ['path'])
+            comments = []
+    Comment.objects.bulk_update(comments, ['path'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_comment_recipe_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='core.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['recipe', 'path'], name='comment_recipe_path_idx'),
+        ),
+    ]
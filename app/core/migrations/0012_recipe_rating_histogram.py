@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+
+def backfill_histograms(apps, schema_editor):
+    """Populate the per-score counts from existing ratings."""
+    Rating = apps.get_model('core', 'Rating')
+    Recipe = apps.get_model('core', 'Recipe')
+    rows = Rating.objects.filter(score__gte=1, score__lte=5).values_list(
+        'recipe_id', 'score'
+    ).annotate(models.Count('id')).order_by()
+    for recipe_id, score, count in rows:
+        Recipe.objects.filter(pk=recipe_id).update(**{f'rating_{score}_count': count})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_1_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_2_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_3_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_4_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_5_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
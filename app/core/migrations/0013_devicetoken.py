@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:30
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_authtokens(apps, schema_editor):
+    """Carry existing never-expiring tokens over as expiring device tokens."""
+    Token = apps.get_model('authtoken', 'Token')
+    DeviceToken = apps.get_model('core', 'DeviceToken')
+    expires_at = timezone.now() + settings.AUTH_TOKEN_TTL
+    DeviceToken.objects.bulk_create(
+        (
+            DeviceToken(key=token.key, user_id=token.user_id, expires_at=expires_at)
+            for token in Token.objects.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_rating_histogram'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default=core.models.generate_token_key, editable=False, max_length=40, unique=True)),
+                ('device', models.CharField(blank=True, max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'device')},
+            },
+        ),
+        migrations.RunPython(copy_authtokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_devicetoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardBucket',
+            fields=[
+                ('bucket', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(max_length=64)),
+            ],
+        ),
+    ]
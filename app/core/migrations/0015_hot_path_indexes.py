@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+INDEX = models.Index(fields=['user', '-created_at'], name='comment_user_created_idx')
+
+
+def add_index(apps, schema_editor):
+    """Build the index without blocking writes on PostgreSQL."""
+    options = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    schema_editor.add_index(apps.get_model('core', 'Comment'), INDEX, **options)
+
+
+def remove_index(apps, schema_editor):
+    options = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    schema_editor.remove_index(apps.get_model('core', 'Comment'), INDEX, **options)
+
+
+class Migration(migrations.Migration):
+    """Indexes for the hot query paths flagged by ``audit_indexes``.
+
+    Recipe lists filtered by tag or ingredient use the foreign key indexes
+    Django creates on ``tag_id`` and ``ingredient_id`` of the through tables.
+    """
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_shardbucket'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='comment', index=INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_index, remove_index),
+            ],
+        ),
+    ]
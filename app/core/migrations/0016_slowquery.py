@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-19 11:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(editable=False, max_length=40, unique=True)),
+                ('fingerprint', models.TextField()),
+                ('database', models.CharField(max_length=64)),
+                ('view', models.CharField(blank=True, max_length=255)),
+                ('sql', models.TextField()),
+                ('params', models.TextField(blank=True)),
+                ('plan', models.TextField(blank=True)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0, help_text='Milliseconds')),
+                ('max_time', models.FloatField(default=0, help_text='Milliseconds')),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='slowquery',
+            index=models.Index(fields=['-total_time'], name='slowquery_total_time_idx'),
+        ),
+    ]
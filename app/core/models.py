@@ -1,15 +1,23 @@
 # backend/app/core/models.py
 
+import binascii
 import uuid
 import os
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import RowNumber, Substr
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.sharding import ShardedQuerySet
+
+
+RATING_SCORES = range(1, 6)
+
 
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image."""
@@ -49,6 +57,63 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+def generate_token_key():
+    """Generate a random 40 character API token key."""
+    return binascii.hexlify(os.urandom(20)).decode()
+
+
+class DeviceToken(models.Model):
+    """Expiring API token issued to one of a user's devices."""
+    key = models.CharField(
+        max_length=40, unique=True, default=generate_token_key, editable=False
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='auth_tokens',
+        on_delete=models.CASCADE,
+    )
+    device = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'device')
+
+    def __str__(self):
+        return self.key
+
+    @classmethod
+    def issue(cls, user, device=''):
+        """Return a user's device token, renewed, or a new one if expired.
+
+        Logging in again on a device, or without one, keeps the token other
+        clients of that device may share valid.
+        """
+        with transaction.atomic():
+            token = cls.objects.select_for_update().filter(
+                user=user, device=device
+            ).first()
+            if token is None or token.is_expired:
+                return cls.rotate(user, device)
+            token.expires_at = timezone.now() + settings.AUTH_TOKEN_TTL
+            token.save(update_fields=['expires_at'])
+            return token
+
+    @classmethod
+    def rotate(cls, user, device=''):
+        """Create a fresh token for a user's device, replacing any old one."""
+        with transaction.atomic():
+            cls.objects.filter(user=user, device=device).delete()
+            return cls.objects.create(
+                user=user,
+                device=device,
+                expires_at=timezone.now() + settings.AUTH_TOKEN_TTL,
+            )
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
 class Recipe(models.Model):
     """Recipe object"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -63,17 +128,74 @@ class Recipe(models.Model):
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_recipes', blank=True)
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
     ratings_count = models.IntegerField(default=0)
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
+
+    objects = ShardedQuerySet.as_manager()
 
     def __str__(self):
         return self.title
 
-    def update_rating(self):
-        ratings = Rating.objects.filter(recipe=self)
-        total_score = sum(rating.score for rating in ratings)
-        self.ratings_count = ratings.count()
+    @property
+    def rating_histogram(self):
+        """Return the number of ratings for each score."""
+        return {
+            score: getattr(self, f'rating_{score}_count')
+            for score in RATING_SCORES
+        }
+
+    def _set_average_rating(self):
+        total_score = sum(
+            score * count for score, count in self.rating_histogram.items()
+        )
         self.average_rating = total_score / self.ratings_count if self.ratings_count else 0
+
+    def update_rating(self):
+        """Recompute the rating summary from all of the recipe's ratings."""
+        counts = dict(
+            Rating.objects.filter(recipe=self).values_list('score').annotate(
+                models.Count('id')
+            )
+        )
+        for score in RATING_SCORES:
+            setattr(self, f'rating_{score}_count', counts.get(score, 0))
+        self.ratings_count = sum(
+            counts.get(score, 0) for score in RATING_SCORES
+        )
+        self._set_average_rating()
         self.save()
 
+    def apply_rating_change(self, added=None, removed=None):
+        """Adjust the rating summary for an added, changed or removed score."""
+        if added == removed:
+            return
+        delta = int(added is not None) - int(removed is not None)
+        updates = {'ratings_count': models.F('ratings_count') + delta}
+        if removed is not None:
+            field = f'rating_{removed}_count'
+            updates[field] = models.F(field) - 1
+        if added is not None:
+            field = f'rating_{added}_count'
+            updates[field] = models.F(field) + 1
+        fields = ['ratings_count'] + [
+            f'rating_{score}_count' for score in RATING_SCORES
+        ]
+        # Not self._state.db: the recipe may have been read from a replica.
+        using = router.db_for_write(Recipe, instance=self)
+        recipes = Recipe.objects.using(using)
+        with transaction.atomic(using=using):
+            if not recipes.filter(pk=self.pk).update(**updates):
+                return
+            # The row stays locked until commit, so the average is consistent.
+            self.refresh_from_db(using=using, fields=fields)
+            self._set_average_rating()
+            recipes.filter(pk=self.pk).update(
+                average_rating=self.average_rating
+            )
+
 
 class Ingredient(models.Model):
     """Ingredient for recipes."""
@@ -98,12 +220,27 @@ class Rating(models.Model):
     recipe = models.ForeignKey(Recipe, related_name='ratings', on_delete=models.CASCADE)
     score = models.IntegerField()
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'recipe')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.recipe.update_rating()
+        using = kwargs.get('using') or router.db_for_write(
+            Rating, instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            self.recipe.apply_rating_change(
+                added=self.score, removed=getattr(self, '_loaded_score', None)
+            )
+        self._loaded_score = self.score
 
 
 class Follow(models.Model):
@@ -115,10 +252,165 @@ class Follow(models.Model):
 
 
 class Comment(models.Model):
+    """Comment on a recipe, optionally replying to another comment.
+
+    ``path`` is a materialized path of zero-padded ancestor IDs ending with
+    the comment's own ID, so a whole thread is one range scan ordered by path.
+    IDs are padded to ``PATH_STEP`` digits, so saving a comment with a longer
+    ID raises ``ValueError``.
+    """
+    PATH_STEP = 10
+    MAX_DEPTH = 255 // PATH_STEP - 1
+
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="comments")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    parent = models.ForeignKey(
+        'self', null=True, blank=True, related_name='replies',
+        on_delete=models.CASCADE,
+    )
+    path = models.CharField(max_length=255, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.IntegerField(default=0)
     content = models.TextField(max_length=1000)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['recipe', '-created_at', '-id'],
+                name='comment_recipe_created_idx',
+            ),
+            models.Index(
+                fields=['recipe', 'path'], name='comment_recipe_path_idx'
+            ),
+            models.Index(
+                fields=['user', '-created_at'], name='comment_user_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return f'Comment by {self.user} on {self.recipe}'
+
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        if is_new and self.parent_id:
+            self.depth = self.parent.depth + 1
+        using = kwargs.get('using') or router.db_for_write(
+            Comment, instance=self
+        )
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if is_new:
+                self._set_path()
+
+    def _set_path(self):
+        """Store the path of a new comment and count it on its parent."""
+        if len(str(self.pk)) > self.PATH_STEP:
+            raise ValueError(
+                f'Comment ID {self.pk} exceeds {self.PATH_STEP} digits.'
+            )
+        prefix = self.parent.path if self.parent_id else ''
+        self.path = f'{prefix}{self.pk:0{self.PATH_STEP}d}'
+        comments = Comment.objects.using(self._state.db)
+        comments.filter(pk=self.pk).update(path=self.path)
+        if self.parent_id:
+            comments.filter(pk=self.parent_id).update(
+                reply_count=models.F('reply_count') + 1
+            )
+
+    @classmethod
+    def next_path(cls, path):
+        """Return the first path sorting after the subtree rooted at path."""
+        last = int(path[-cls.PATH_STEP:]) + 1
+        return f'{path[:-cls.PATH_STEP]}{last:0{cls.PATH_STEP}d}'
+
+    def thread(self):
+        """Return this comment and all of its replies in thread order."""
+        return Comment.objects.using(self._state.db).filter(
+            recipe_id=self.recipe_id,
+            path__gte=self.path,
+            path__lt=self.next_path(self.path),
+        ).order_by('path')
+
+    @classmethod
+    def first_replies(cls, roots, limit):
+        """Return up to limit replies for each root comment, keyed by root ID.
+
+        Replies are numbered per thread with ``ROW_NUMBER()``, so the database
+        returns at most limit rows per root however busy the thread.
+        """
+        replies = {root.id: [] for root in roots}
+        if not replies:
+            return replies
+        using = roots[0]._state.db
+        paths = sorted(root.path for root in roots)
+        ranked = cls.objects.using(using).filter(
+            recipe_id=roots[0].recipe_id,
+            depth__gt=0,
+            path__gt=paths[0],
+            path__lt=cls.next_path(paths[-1]),
+        ).annotate(thread_rank=models.Window(
+            RowNumber(),
+            partition_by=[Substr('path', 1, cls.PATH_STEP)],
+            order_by=models.F('path').asc(),
+        ))
+        sql, params = ranked.query.get_compiler(using=using).as_sql()
+        queryset = cls.objects.using(using).raw(
+            f'SELECT * FROM ({sql}) ranked'
+            ' WHERE thread_rank <= %s ORDER BY path',
+            (*params, limit),
+        )
+        for reply in queryset:
+            thread = replies.get(int(reply.path[:cls.PATH_STEP]))
+            if thread is not None:
+                thread.append(reply)
+        return replies
+
+
+class ShardBucket(models.Model):
+    """Shard holding the recipes and messages of users in a bucket.
+
+    Buckets without a row live on the default database (see core.sharding).
+    """
+    bucket = models.PositiveIntegerField(primary_key=True)
+    shard = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f'Bucket {self.bucket} on {self.shard}'
+
+
+class SlowQuery(models.Model):
+    """Aggregate of the slow runs of one query shape from one view.
+
+    Recorded by ``core.slowqueries``; ``sql``, ``params`` and ``plan`` are
+    from a sample run, with the types and lengths of parameters only.
+    """
+    key = models.CharField(max_length=40, unique=True, editable=False)
+    fingerprint = models.TextField()
+    database = models.CharField(max_length=64)
+    view = models.CharField(max_length=255, blank=True)
+    sql = models.TextField()
+    params = models.TextField(blank=True)
+    plan = models.TextField(blank=True)
+    calls = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0, help_text='Milliseconds')
+    max_time = models.FloatField(default=0, help_text='Milliseconds')
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'slow queries'
+        indexes = [
+            models.Index(
+                fields=['-total_time'], name='slowquery_total_time_idx'
+            ),
+        ]
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0
+
+    def __str__(self):
+        return self.fingerprint[:80]
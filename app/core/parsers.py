@@ -0,0 +1,54 @@
+"""
+Fast JSON and MessagePack parsers.
+"""
+import decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from core.renderers import (
+    DECIMAL_EXT_TYPE,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    msgpack,
+    orjson,
+)
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding request bodies with orjson when available."""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8').lower()
+        if orjson is None or encoding not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+def _msgpack_ext_hook(code, data):
+    if code == DECIMAL_EXT_TYPE:
+        return decimal.Decimal(data.decode('ascii'))
+    return msgpack.ExtType(code, data)
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies, restoring Decimals and datetimes."""
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackParser requires msgpack.')
+        try:
+            return msgpack.unpackb(
+                stream.read(), ext_hook=_msgpack_ext_hook, timestamp=3,
+            )
+        except ValueError as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
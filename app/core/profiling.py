@@ -0,0 +1,269 @@
+"""
+On-demand profiling of single requests by staff users.
+
+A request carrying an ``X-Profile`` header or ``?profile=`` query parameter
+from a staff user runs under a profiler:
+
+- ``cprofile`` (the default, e.g. ``?profile=1``) writes a ``.pstats`` file
+  for ``pstats``/snakeviz;
+- ``sampling`` samples the request thread's stack every
+  ``PROFILE_SAMPLE_INTERVAL`` seconds and writes flamegraph-ready collapsed
+  stacks (``.collapsed``).
+
+Profiles go to ``MEDIA_ROOT/profiles`` with a ``.json`` description, and the
+response names the file in an ``X-Profile`` header. Requests arriving while
+another is profiled run normally. Other requests only pay for a header
+lookup.
+
+Under ASGI a profiled request's sync code (views, serializers, queries) runs
+in a thread of its own, which is the thread profiled; time spent awaiting
+on the event loop is not profiled.
+"""
+import asyncio
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PROFILES_DIR = 'profiles'
+MODES = {'cprofile': '.pstats', 'sampling': '.collapsed'}
+
+# Held while a request is profiled; one profile runs at a time per process.
+_active = threading.Lock()
+
+
+def profiles_dir():
+    return os.path.join(settings.MEDIA_ROOT, PROFILES_DIR)
+
+
+def _requested_mode(request):
+    """Return the profiler mode the request asks for, or None."""
+    value = request.META.get('HTTP_X_PROFILE')
+    if value is None:
+        if 'profile=' not in request.META.get('QUERY_STRING', ''):
+            return None
+        value = request.GET.get('profile', '')
+    value = value.strip().lower()
+    if value in ('1', 'true'):
+        return 'cprofile'
+    return value if value in MODES else None
+
+
+def _is_staff(request):
+    """Return whether the session or API credentials belong to staff."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    api_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(api_request)
+        except APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+def _frame_name(code):
+    path = os.path.normpath(code.co_filename).split(os.sep)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='profile-sampler', daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def collapsed(self):
+        """Return the stacks in the collapsed format of flamegraph.pl."""
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.most_common()
+        )
+
+
+class Profile:
+    """One profiled request, saved under ``MEDIA_ROOT/profiles``."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.started_at = datetime.now(timezone.utc)
+        self.name = (
+            f'{self.started_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:12]}'
+            f'{MODES[mode]}'
+        )
+        self._profiler = None
+
+    def start(self):
+        if self.mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(
+                threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL
+            )
+            self._profiler.start()
+        self._start = time.perf_counter()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self._start
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+
+    def stop_thread(self):
+        """Stop, from the request's own sync thread, which then ends."""
+        self.stop()
+        # Django's request_finished only closes the shared thread's
+        # connections.
+        connections.close_all()
+
+    def save(self, request, response):
+        directory = profiles_dir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.name)
+        if self.mode == 'cprofile':
+            self._profiler.dump_stats(path)
+        else:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(self._profiler.collapsed())
+        user = getattr(request, 'user', None)
+        with open(f'{path}.json', 'w', encoding='utf-8') as file:
+            json.dump({
+                'name': self.name,
+                'mode': self.mode,
+                'started_at': self.started_at.isoformat(),
+                'duration_ms': round(self.duration * 1000, 1),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'user': getattr(user, 'email', None),
+            }, file)
+        _prune(directory)
+
+
+def _prune(directory):
+    """Delete the oldest profiles beyond ``PROFILE_MAX_FILES``."""
+    descriptions = sorted(
+        name for name in os.listdir(directory) if name.endswith('.json')
+    )
+    for description in descriptions[:-settings.PROFILE_MAX_FILES]:
+        for name in (description, description[:-len('.json')]):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def recent_profiles(limit):
+    """Return descriptions of the newest saved profiles, newest first."""
+    directory = profiles_dir()
+    try:
+        names = sorted(
+            (name for name in os.listdir(directory) if name.endswith('.json')),
+            reverse=True,
+        )
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as file:
+                profiles.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(name):
+    """Return the path of a saved profile, or None if there is none by name."""
+    if name != os.path.basename(name):
+        return None
+    if not name.endswith(tuple(MODES.values())):
+        return None
+    path = os.path.join(profiles_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """Profile staff requests asking with ``X-Profile`` or ``?profile=``."""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            mode = _requested_mode(request)
+            if (mode is None or not await sync_to_async(_is_staff)(request)
+                    or not _active.acquire(blocking=False)):
+                return await get_response(request)
+            try:
+                profile = Profile(mode)
+                # Django otherwise runs every request's sync code in one
+                # shared thread, which cannot be profiled for this request.
+                async with ThreadSensitiveContext():
+                    await sync_to_async(profile.start)()
+                    try:
+                        response = await get_response(request)
+                    finally:
+                        await sync_to_async(profile.stop_thread)()
+            finally:
+                _active.release()
+            save = sync_to_async(profile.save, thread_sensitive=False)
+            await save(request, response)
+            response['X-Profile'] = profile.name
+            return response
+    else:
+        def middleware(request):
+            mode = _requested_mode(request)
+            if (mode is None or not _is_staff(request)
+                    or not _active.acquire(blocking=False)):
+                return get_response(request)
+            try:
+                profile = Profile(mode)
+                profile.start()
+                try:
+                    response = get_response(request)
+                finally:
+                    profile.stop()
+            finally:
+                _active.release()
+            profile.save(request, response)
+            response['X-Profile'] = profile.name
+            return response
+    return middleware
@@ -0,0 +1,145 @@
+"""
+Per-request query counts, database time and duplicate-query fingerprints.
+"""
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.middleware import request_hook
+
+logger = logging.getLogger(__name__)
+
+# Stats collectors recording the current context's queries, outermost first.
+_collectors = contextvars.ContextVar('query_stats_collectors', default=())
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_VALUE_LIST = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Return sql with literals and placeholders replaced, e.g. for grouping.
+
+    ``WHERE id IN (%s, %s)`` and ``WHERE id IN (1)`` both become
+    ``WHERE id IN (?)``.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(?)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Number, duration and fingerprints of the queries run in a context.
+
+    Fingerprints of queries run on a shard other than ``default`` are
+    prefixed with its alias, so running a query on every shard (see
+    ``core.sharding.scatter``) does not count as repeating it. Without
+    ``fingerprints``, only the count and duration are kept.
+    """
+
+    def __init__(self, fingerprints=True):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self._fingerprint = fingerprints
+
+    def add(self, sql, duration, shard=None):
+        self.count += 1
+        self.duration += duration
+        if not self._fingerprint:
+            return
+        key = fingerprint(sql)
+        self.fingerprints[f'{shard}: {key}' if shard else key] += 1
+
+    def duplicates(self):
+        """Return (fingerprint, count) pairs run more than once, most first."""
+        return [
+            (sql, count) for sql, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper timing the query into the active collectors."""
+    collectors = _collectors.get()
+    if not collectors:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        alias = context['connection'].alias
+        shard = None
+        if (alias != DEFAULT_DB_ALIAS
+                and alias in settings.DATABASE_SHARDS):
+            shard = alias
+        for stats in collectors:
+            stats.add(sql, elapsed, shard)
+
+
+def install(connection):
+    """Add ``record_query`` to the execute wrappers of connection.
+
+    Installed on every new connection rather than per request, so queries
+    run from ``sync_to_async`` worker threads are recorded as well.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def record_queries(fingerprints=True):
+    """Collect the queries run within the block into a ``QueryStats``."""
+    stats = QueryStats(fingerprints)
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+def _report(request, response, stats):
+    duration = stats.duration * 1000
+    timing = f'db;dur={duration:.1f};desc="{stats.count} queries"'
+    if response.has_header('Server-Timing'):
+        timing = f"{response['Server-Timing']}, {timing}"
+    response['Server-Timing'] = timing
+    logger.info(
+        '%s %s ran %d queries in %.1f ms',
+        request.method, request.path, stats.count, duration,
+    )
+    duplicates = stats.duplicates()
+    if duplicates:
+        logger.warning(
+            '%s %s repeated queries:\n%s', request.method, request.path,
+            '\n'.join(f'  {count}x {sql}' for sql, count in duplicates),
+        )
+
+
+@request_hook
+def query_stats_middleware(request):
+    """Report each request's query count and database time.
+
+    Adds a ``Server-Timing: db;dur=<ms>;desc="<n> queries"`` header and logs
+    the totals. For ``QUERY_REPEATS_SAMPLE_RATE`` of requests, queries are
+    also fingerprinted and those repeated within the request are logged as
+    a warning. The stats are available to outer middleware as
+    ``request.query_stats``.
+    """
+    sampled = random.random() < settings.QUERY_REPEATS_SAMPLE_RATE
+    with record_queries(fingerprints=sampled) as stats:
+        request.query_stats = stats
+        response = yield
+    _report(request, response, stats)
@@ -0,0 +1,89 @@
+"""
+Fast JSON and MessagePack renderers.
+"""
+import datetime
+import decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+from core.tracing import traced
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+# MessagePack extension type carrying a Decimal as its ASCII string form.
+DECIMAL_EXT_TYPE = 1
+
+
+def _default(obj, _encoder=encoders.JSONEncoder()):
+    """Encode types orjson lacks (Decimal, lazy strings, ...) like DRF does."""
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same output as DRF's, but through orjson.
+
+    Pretty-printed responses (e.g. the browsable API) and missing orjson
+    fall back to the stdlib implementation.
+    """
+    options = (
+        0 if orjson is None else orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    )
+
+    @traced('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_default, option=self.options)
+        # Escape U+2028/U+2029 as JSONRenderer does, keeping output valid JS.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def _msgpack_default(obj, _encoder=encoders.JSONEncoder()):
+    """Encode Decimals and datetimes losslessly, other types like DRF does."""
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(DECIMAL_EXT_TYPE, str(obj).encode('ascii'))
+    if isinstance(obj, datetime.datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=datetime.timezone.utc)
+        return msgpack.Timestamp.from_datetime(obj)
+    return _encoder.default(obj)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer which serializes to MessagePack.
+
+    Decimals travel as extension type ``DECIMAL_EXT_TYPE`` and datetimes as
+    the standard timestamp extension, so neither loses precision.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @traced('render')
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer requires msgpack.')
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, datetime=False)
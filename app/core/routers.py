@@ -0,0 +1,136 @@
+"""
+Database router sending reads to replicas with read-your-writes stickiness.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.middleware import request_hook
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replica routing state of the request being handled, if any.
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    """Tracks whether the current request must read from the primary."""
+
+    def __init__(self, pinned=False):
+        self.user_id = None
+        self.pinned = pinned
+        self.wrote = False
+
+
+def _pin_cache():
+    if settings.REPLICA_PIN_CACHE_ALIAS is None:
+        return None
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def bind_user(user_id):
+    """Attach the authenticated user to the current request.
+
+    Reads stick to the primary if the user wrote within the last
+    ``REPLICA_STICKY_SECONDS``, when ``REPLICA_PIN_CACHE_ALIAS`` names a
+    shared cache.
+    """
+    state = _request_state.get()
+    if state is None or not settings.DATABASE_REPLICAS:
+        return
+    state.user_id = user_id
+    cache = _pin_cache()
+    if not state.pinned and cache is not None and cache.get(_pin_key(user_id)):
+        state.pinned = True
+
+
+def _start(request):
+    """Return the routing state of a new request.
+
+    Unsafe requests use the primary throughout, so objects they modify are
+    never loaded from a lagging replica, and so do clients holding the pin
+    cookie of a recent write.
+    """
+    return RequestState(pinned=(
+        request.method not in SAFE_METHODS
+        or settings.REPLICA_PIN_COOKIE in request.COOKIES
+    ))
+
+
+def _finish(state, response):
+    """Keep the client's reads on the primary after a write."""
+    if not state.wrote or not settings.DATABASE_REPLICAS:
+        return
+    if response is not None:
+        response.set_cookie(
+            settings.REPLICA_PIN_COOKIE, '1',
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True, samesite='Lax',
+        )
+    cache = _pin_cache()
+    if cache is not None and state.user_id is not None:
+        cache.set(
+            _pin_key(state.user_id), True, settings.REPLICA_STICKY_SECONDS
+        )
+
+
+@request_hook
+def replica_pinning_middleware(request):
+    """Track per-request writes so the router can pin reads to the primary."""
+    state = _start(request)
+    token = _request_state.set(state)
+    response = None
+    try:
+        response = yield
+    finally:
+        _request_state.reset(token)
+        _finish(state, response)
+
+
+class PrimaryReplicaRouter:
+    """Route writes to the primary and reads to a random replica.
+
+    Reads go to the primary instead when no replicas are configured, inside
+    a transaction on the primary, for models in ``DATABASE_PRIMARY_MODELS``,
+    for the whole of unsafe (POST, PUT, PATCH, DELETE) requests, after the
+    current request has written, and for ``REPLICA_STICKY_SECONDS`` after
+    the client's last write.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower in settings.DATABASE_PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if state is not None and state.pinned:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if (instance is not None and instance._state.db is not None
+                and instance._state.db not in (
+                    DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)):
+            # Related to a row on a database this router does not manage
+            # (e.g. a shard): Django's default keeps the write there.
+            return None
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,37 @@
+"""
+Serializers for the core APIs.
+"""
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for one sub-request of a batch."""
+    method = serializers.ChoiceField(
+        choices=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE'],
+        default='GET',
+    )
+    path = serializers.RegexField(r'^/api/', max_length=2000)
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        if value.split('?', 1)[0].rstrip('/') == '/api/batch':
+            raise serializers.ValidationError('Batches cannot be nested.')
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of sub-requests."""
+    requests = BatchItemSerializer(many=True)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError(
+                'At least one request is required.'
+            )
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests are allowed.'
+            )
+        return value
@@ -0,0 +1,324 @@
+"""
+Optional horizontal sharding of recipes and messages by owner user ID.
+
+Users hash into ``SHARD_BUCKETS`` virtual buckets; the ``ShardBucket`` table
+on the default database maps buckets to the aliases in ``DATABASE_SHARDS``
+(unmapped buckets live on ``default``). Recipes, with their ratings,
+comments and many-to-many rows, follow the recipe owner; messages follow
+their sender. Reference tables (users, tags, ingredients, conversations) are
+written to ``default`` and mirrored to every other shard, so joins and
+foreign keys keep working within a shard.
+
+With a single shard every router method returns ``None`` and nothing
+changes.
+"""
+import contextvars
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DEFAULT_DB_ALIAS, models
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+SHARD_BUCKETS = 1024
+# Upper bound on shards; sharded ID sequences step by this much.
+MAX_SHARDS = 64
+
+# Sharded models, with the field naming the owner user for new rows.
+SHARD_KEYS = {
+    'core.recipe': 'user_id',
+    'messaging.message': 'sender_id',
+}
+# Models stored on the shard of the recipe they belong to.
+RECIPE_COLOCATED = {
+    'core.rating',
+    'core.comment',
+    'core.recipe_tags',
+    'core.recipe_ingredients',
+    'core.recipe_likes',
+}
+SHARDED_MODELS = set(SHARD_KEYS) | RECIPE_COLOCATED
+# Models written to default and mirrored to every other shard.
+REFERENCE_MODELS = {
+    'core.user',
+    'core.tag',
+    'core.ingredient',
+    'messaging.conversation',
+}
+
+# Many-to-many tables of reference models, mirrored with them.
+REFERENCE_M2M = {
+    'messaging.conversation_participants',
+}
+
+# Shard used by queries without a routing hint, e.g. within a request for
+# an object already located on a shard.
+_current_shard = contextvars.ContextVar('current_shard', default=None)
+
+
+def shard_aliases():
+    return settings.DATABASE_SHARDS
+
+
+def sharding_enabled():
+    return len(settings.DATABASE_SHARDS) > 1
+
+
+def bucket_for_user(user_id):
+    return user_id % SHARD_BUCKETS
+
+
+class ShardMap:
+    """Process-local cache of the bucket to shard mapping."""
+
+    def __init__(self):
+        self._buckets = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def buckets(self):
+        with self._lock:
+            age = time.monotonic() - self._loaded_at
+            if self._buckets is None or age > settings.SHARD_MAP_TTL:
+                from core.models import ShardBucket
+                buckets = ShardBucket.objects.using(DEFAULT_DB_ALIAS)
+                self._buckets = dict(buckets.values_list('bucket', 'shard'))
+                self._loaded_at = time.monotonic()
+            return self._buckets
+
+    def shard_for_bucket(self, bucket):
+        return self.buckets().get(bucket, DEFAULT_DB_ALIAS)
+
+    def shard_for_user(self, user_id):
+        return self.shard_for_bucket(bucket_for_user(user_id))
+
+    def invalidate(self):
+        with self._lock:
+            self._buckets = None
+
+
+shard_map = ShardMap()
+
+
+@contextmanager
+def use_shard(alias):
+    """Send unhinted queries for sharded models to alias (None: no change)."""
+    if alias is None:
+        yield
+        return
+    token = _current_shard.set(alias)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+def _instance_shard(model, instance):
+    """Return the shard holding rows of model related to instance, if known."""
+    label = instance._meta.label_lower
+    if instance._state.db is not None and label in SHARDED_MODELS:
+        return instance._state.db
+    model_label = model._meta.label_lower
+    if label == settings.AUTH_USER_MODEL.lower() and model_label in SHARD_KEYS:
+        # e.g. user.recipe_set: the user's own rows are on the user's shard.
+        return shard_map.shard_for_user(instance.pk)
+    if label in SHARD_KEYS:
+        user_id = getattr(instance, SHARD_KEYS[label])
+        if user_id is not None:
+            return shard_map.shard_for_user(user_id)
+    if label in RECIPE_COLOCATED:
+        recipe = instance._state.fields_cache.get('recipe')
+        if recipe is not None and recipe._state.db is not None:
+            return recipe._state.db
+    return None
+
+
+def _other_shards():
+    return [alias for alias in shard_aliases() if alias != DEFAULT_DB_ALIAS]
+
+
+def mirror_save(instance):
+    """Copy a reference model row from default to every other shard."""
+    model = type(instance)
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in model._meta.concrete_fields
+    }
+    for alias in _other_shards():
+        manager = model._base_manager.using(alias)
+        if not manager.filter(pk=instance.pk).update(**values):
+            manager.bulk_create([model(**values)])
+
+
+def mirror_delete(instance):
+    """Delete a reference row, and what cascades from it, on other shards."""
+    manager = type(instance)._base_manager
+    for alias in _other_shards():
+        manager.using(alias).filter(pk=instance.pk).delete()
+
+
+def mirror_m2m(through, instance):
+    """Copy the many-to-many rows of instance in through to other shards."""
+    field = next(
+        field for field in through._meta.concrete_fields
+        if field.is_relation and isinstance(instance, field.related_model)
+    )
+    rows = list(
+        through._base_manager.using(DEFAULT_DB_ALIAS).filter(
+            **{field.name: instance}
+        )
+    )
+    for alias in _other_shards():
+        manager = through._base_manager.using(alias)
+        manager.filter(**{field.attname: instance.pk}).delete()
+        manager.bulk_create(rows)
+
+
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet whose ``create()`` routes by the new instance, like ``save()``.
+
+    ``QuerySet.create()`` otherwise picks the database before the instance
+    exists, so the owner's shard is unknown.
+    """
+
+    def create(self, **kwargs):
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class ShardRouter:
+    """Route sharded models to their owner's shard."""
+
+    def _db(self, model, instance):
+        if (not sharding_enabled()
+                or model._meta.label_lower not in SHARDED_MODELS):
+            return None
+        alias = None
+        if instance is not None:
+            alias = _instance_shard(model, instance)
+        return alias or _current_shard.get() or DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if (sharding_enabled() and instance is not None
+                and model._meta.label_lower in REFERENCE_MODELS
+                and instance._meta.label_lower in SHARDED_MODELS):
+            # e.g. recipe.tags: join against the copies on the recipe's shard.
+            return instance._state.db
+        return self._db(model, instance)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not sharding_enabled():
+            return None
+        shards = set(shard_aliases())
+        if obj1._state.db in shards and obj2._state.db in shards:
+            return True
+        return None
+
+
+def scatter(queryset):
+    """Yield (alias, queryset) per shard, or (None, queryset) if unsharded."""
+    if not sharding_enabled():
+        yield None, queryset
+        return
+    for alias in shard_aliases():
+        yield alias, queryset.using(alias)
+
+
+def merge_keyset(queryset, limit, after=None, key='id'):
+    """Return up to limit (alias, item) pairs across shards, descending by key.
+
+    Each shard returns its own first ``limit`` items past ``after`` and the
+    sorted runs are merged, so a page costs one bounded query per shard.
+    """
+    runs = []
+    for alias, shard_queryset in scatter(queryset):
+        if after is not None:
+            shard_queryset = shard_queryset.filter(**{f'{key}__lt': after})
+        items = shard_queryset.order_by(f'-{key}')[:limit]
+        runs.append([(alias, item) for item in items])
+
+    def sort_key(pair):
+        item = pair[1]
+        return item[key] if isinstance(item, dict) else getattr(item, key)
+
+    return list(islice(heapq.merge(*runs, key=sort_key, reverse=True), limit))
+
+
+class ShardedViewMixin:
+    """Viewset mixin locating objects and listing pages across shards.
+
+    A located object's shard becomes the default for the rest of the
+    request, so related queries without a routing hint follow it.
+    """
+    # Page size of merged listings when sharding is enabled.
+    sharded_page_size = 20
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _current_shard.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _current_shard.reset(token)
+
+    def get_object(self):
+        if not sharding_enabled():
+            return super().get_object()
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        for alias, shard_queryset in scatter(queryset):
+            try:
+                obj = shard_queryset.filter(**lookup).first()
+            except (TypeError, ValueError, DjangoValidationError):
+                raise Http404
+            if obj is not None:
+                self.check_object_permissions(self.request, obj)
+                _current_shard.set(alias)
+                return obj
+        raise Http404
+
+    def sharded_list(self, queryset, render=None):
+        """Respond with one merged keyset page (newest first) across shards.
+
+        ``?after=<id>`` continues from the previous page's last item.
+        """
+        after = self.request.query_params.get('after')
+        if after is not None:
+            try:
+                after = int(after)
+            except ValueError:
+                raise ValidationError({'after': [_('Enter a valid ID.')]})
+
+        page = merge_keyset(queryset, self.sharded_page_size, after)
+        if render is None:
+            def render(items):
+                return self.get_serializer(items, many=True).data
+        rendered = {}
+        for alias in {alias for alias, _ in page}:
+            items = [item for item_alias, item in page if item_alias == alias]
+            with use_shard(alias):
+                rendered[alias] = iter(render(items))
+        data = [next(rendered[alias]) for alias, _ in page]
+
+        next_url = None
+        if len(page) == self.sharded_page_size:
+            last = page[-1][1]
+            last_id = last['id'] if isinstance(last, dict) else last.pk
+            next_url = replace_query_param(
+                self.request.build_absolute_uri(), 'after', last_id
+            )
+        return Response({'results': data, 'next': next_url})
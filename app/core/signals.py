@@ -0,0 +1,125 @@
+"""
+Signal handlers keeping the token cache and shard copies consistent, and
+instrumenting new database connections.
+"""
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete,
+)
+from django.dispatch import receiver
+from core import querystats, sharding, slowqueries, tracing
+from core.authentication import invalidate_token
+from core.models import Comment, DeviceToken, Rating, Recipe, ShardBucket
+
+# (alias, pk) of recipes whose delete is cascading to their ratings.
+_deleting_recipes = ContextVar('deleting_recipes', default=frozenset())
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Record query counts, timings, trace spans and slow queries."""
+    querystats.install(connection)
+    tracing.install(connection)
+    slowqueries.install(connection)
+
+
+@receiver(post_save, sender=DeviceToken)
+@receiver(post_delete, sender=DeviceToken)
+def token_changed(sender, instance, **kwargs):
+    """Forget a renewed or deleted token."""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, **kwargs):
+    """Forget a user's tokens when they change, e.g. on deactivation."""
+    if created:
+        return
+    tokens = DeviceToken.objects.filter(user=instance)
+    for key in tokens.values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, using, **kwargs):
+    """Decrement the parent's reply count, also on queryset and cascades."""
+    if instance.parent_id:
+        Comment.objects.using(using).filter(pk=instance.parent_id).update(
+            reply_count=F('reply_count') - 1
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, using, **kwargs):
+    """Note a recipe about to be deleted; its ratings are deleted first."""
+    _deleting_recipes.set(_deleting_recipes.get() | {(using, instance.pk)})
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, using, **kwargs):
+    _deleting_recipes.set(_deleting_recipes.get() - {(using, instance.pk)})
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, using, **kwargs):
+    """Remove a deleted score from its recipe's histogram.
+
+    Also runs for queryset and cascade deletes.
+    """
+    if (using, instance.recipe_id) in _deleting_recipes.get():
+        return
+    recipe = Recipe(pk=instance.recipe_id)
+    recipe._state.db = using
+    score = getattr(instance, '_loaded_score', instance.score)
+    recipe.apply_rating_change(removed=score)
+
+
+@receiver(post_save, sender=ShardBucket)
+@receiver(post_delete, sender=ShardBucket)
+def shard_map_changed(sender, **kwargs):
+    """Reload the shard map after a bucket moves."""
+    sharding.shard_map.invalidate()
+
+
+def _mirrored(instance):
+    # Settings may turn sharding off after the receivers are connected.
+    return (
+        sharding.sharding_enabled()
+        and instance._state.db == DEFAULT_DB_ALIAS
+    )
+
+
+def reference_saved(sender, instance, raw, **kwargs):
+    """Copy users, tags, ingredients and conversations to every shard."""
+    if not raw and _mirrored(instance):
+        sharding.mirror_save(instance)
+
+
+def reference_deleted(sender, instance, **kwargs):
+    """Delete mirrored reference rows, cascading within each shard."""
+    if _mirrored(instance):
+        sharding.mirror_delete(instance)
+
+
+def reference_m2m_changed(sender, instance, action, **kwargs):
+    """Copy conversation participants to every shard."""
+    changed = action in ('post_add', 'post_remove', 'post_clear')
+    if changed and _mirrored(instance):
+        sharding.mirror_m2m(sender, instance)
+
+
+# Only reference models, so deletes of other models keep their fast path.
+if sharding.sharding_enabled():
+    for label in sharding.REFERENCE_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(reference_saved, sender=model)
+        post_delete.connect(reference_deleted, sender=model)
+    for label in sharding.REFERENCE_M2M:
+        through = apps.get_model(label)
+        m2m_changed.connect(reference_m2m_changed, sender=through)
@@ -0,0 +1,197 @@
+"""
+Recorder aggregating queries slower than ``SLOW_QUERY_THRESHOLD_MS``.
+
+An execute wrapper on every connection times queries. Slow ones are
+queued with their view, and a background thread per process folds them
+into ``SlowQuery`` rows keyed by fingerprint, view and database, capturing
+an ``EXPLAIN`` plan of new SELECTs. Only the types and lengths of query
+parameters are stored, and quoted literals in plans are masked, so tokens
+and emails do not end up in the admin. Nothing is written inside the
+request's transaction, and queries are dropped while the queue is full.
+"""
+import contextvars
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.middleware import request_hook
+from core.querystats import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Request being handled, for the view name of its queries.
+_request = contextvars.ContextVar('slow_query_request', default=None)
+
+# Quoted literal in a plan, e.g. a parameter PostgreSQL shows in a filter.
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+class SlowQueryRecorder:
+    """Queue of slow queries saved by a background thread."""
+
+    def __init__(self):
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Set while saving, so the recorder's own queries are not recorded.
+        self._local = threading.local()
+        self.dropped = 0
+
+    def is_saving(self):
+        return getattr(self._local, 'saving', False)
+
+    def submit(self, item):
+        with self._lock:
+            if self._pid != os.getpid():
+                # First use in this process, e.g. a forked worker.
+                self._pid = os.getpid()
+                self._queue = queue.Queue(settings.SLOW_QUERY_QUEUE_SIZE)
+                threading.Thread(
+                    target=self._run, args=(self._queue,),
+                    name='slow-queries', daemon=True,
+                ).start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self):
+        """Wait until the queued queries are saved."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def _run(self, items):
+        while True:
+            item = items.get()
+            try:
+                self.save(item)
+            except Exception:
+                logger.exception('Could not record slow query')
+            finally:
+                items.task_done()
+            if items.empty():
+                connections.close_all()
+
+    def save(self, item):
+        """Fold one slow run into its ``SlowQuery`` row."""
+        self._local.saving = True
+        try:
+            self._save(*item)
+        finally:
+            self._local.saving = False
+
+    def _save(self, alias, view, sql, params_shape, params, duration):
+        from core.models import SlowQuery
+
+        shape = fingerprint(sql)
+        key = hashlib.sha1(f'{alias}\0{view}\0{shape}'.encode()).hexdigest()
+        changes = {
+            'calls': F('calls') + 1,
+            'total_time': F('total_time') + duration,
+            'max_time': Greatest('max_time', duration),
+            'last_seen': timezone.now(),
+            'sql': sql,
+            'params': params_shape,
+        }
+        rows = SlowQuery.objects.using(DEFAULT_DB_ALIAS)
+        if rows.filter(key=key).update(**changes):
+            return
+        try:
+            rows.create(
+                key=key, fingerprint=shape, database=alias, view=view,
+                sql=sql, params=params_shape, calls=1, total_time=duration,
+                max_time=duration, plan=explain(alias, sql, params),
+            )
+        except IntegrityError:
+            # Created by another process meanwhile.
+            rows.filter(key=key).update(**changes)
+
+
+recorder = SlowQueryRecorder()
+
+
+def explain(alias, sql, params):
+    """Return the plan of a SELECT on alias, or '' for other statements."""
+    if params is None or sql.lstrip()[:6].upper() != 'SELECT':
+        return ''
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except Exception as exc:
+        return f'EXPLAIN failed: {exc}'
+    plan = '\n'.join(' '.join(str(column) for column in row) for row in rows)
+    return _LITERAL.sub("'?'", plan)
+
+
+def _describe(value):
+    if isinstance(value, (str, bytes, list, tuple)):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def describe_params(params, many=False):
+    """Return the types and lengths of query parameters, not their values."""
+    if params is None:
+        return ''
+    if many:
+        return f'{len(params)} parameter sets'
+    if isinstance(params, dict):
+        return ', '.join(
+            f'{name}: {_describe(value)}' for name, value in params.items()
+        )
+    return ', '.join(_describe(value) for value in params)
+
+
+def _view_name():
+    request = _request.get()
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else ''
+
+
+def record_slow_query(execute, sql, params, many, context):
+    """Execute wrapper submitting queries over the threshold for saving."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if duration >= threshold and not recorder.is_saving():
+            params_shape = describe_params(params, many)
+            recorder.submit((
+                context['connection'].alias,
+                _view_name(),
+                sql,
+                params_shape[:settings.SLOW_QUERY_PARAMS_LENGTH],
+                None if many else params,
+                duration,
+            ))
+
+
+def install(connection):
+    """Add ``record_slow_query`` to the execute wrappers of connection."""
+    if record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_query)
+
+
+@request_hook
+def slow_query_middleware(request):
+    """Make the request's view name available to the slow query recorder."""
+    token = _request.set(request)
+    try:
+        yield
+    finally:
+        _request.reset(token)
@@ -0,0 +1,27 @@
+"""
+Helpers shared by the API tests.
+"""
+from contextlib import contextmanager
+
+from core.querystats import record_queries
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting an upper bound on the queries a block runs."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        """Fail if the block runs more than budget queries.
+
+        The failure lists the queries run, so N+1 patterns show as repeats.
+        """
+        with record_queries() as stats:
+            yield stats
+        if stats.count > budget:
+            queries = '\n'.join(
+                f'  {count}x {sql}'
+                for sql, count in stats.fingerprints.most_common()
+            )
+            self.fail(
+                f'{stats.count} queries run, budget is {budget}:\n{queries}'
+            )
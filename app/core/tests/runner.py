@@ -0,0 +1,58 @@
+"""
+Test runner scoping shards to the tests using them and adding databases
+only the tests use.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import SimpleTestCase, override_settings
+from django.test.runner import DiscoverRunner
+
+# Test-only databases configured like default, e.g. a replica that has not
+# caught up for the router tests. Each is only created for tests using it.
+TEST_DATABASES = ['lagging_replica']
+
+
+def _tests(suite):
+    for test in suite:
+        if hasattr(test, '__iter__'):
+            yield from _tests(test)
+        else:
+            yield test
+
+
+class ShardedTestRunner(DiscoverRunner):
+    """Run tests not using every shard with sharding turned off.
+
+    Saving a user, tag, ingredient or conversation copies it to every shard
+    (see ``core.sharding``), so only tests listing all ``DATABASE_SHARDS``
+    in their databases, like the sharding tests, run sharded. With a single
+    shard this changes nothing.
+    """
+
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        shards = set(settings.DATABASE_SHARDS)
+        if len(shards) < 2:
+            return suite
+        unsharded = {
+            type(test) for test in _tests(suite)
+            if isinstance(test, SimpleTestCase)
+            and type(test).databases != '__all__'
+            and not shards <= type(test).databases
+        }
+        for test_class in unsharded:
+            override_settings(DATABASE_SHARDS=[DEFAULT_DB_ALIAS])(test_class)
+        return suite
+
+    def setup_databases(self, **kwargs):
+        databases = connections.settings
+        default = databases[DEFAULT_DB_ALIAS]
+        for alias in TEST_DATABASES:
+            databases.setdefault(alias, {
+                **default,
+                'TEST': {
+                    **default['TEST'],
+                    'NAME': f"test_{default['NAME']}_{alias}",
+                },
+            })
+        return super().setup_databases(**kwargs)
@@ -0,0 +1,188 @@
+"""
+Tests for cached, expiring token authentication.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache
+from core.models import DeviceToken
+
+ME_URL = reverse('user:me')
+ROTATE_URL = reverse('user:token-rotate')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication backend."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.token = DeviceToken.issue(self.user, device='phone')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        return self.client.get(ME_URL, {'fields': 'id,email'})
+
+    def test_token_lookup_cached(self):
+        """Test repeated requests skip the token and user query."""
+        with self.assertNumQueries(1):
+            res = self.get_me()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.get_me()
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_cached_user_excludes_password(self):
+        """Test the cached user snapshot leaves out the password hash."""
+        self.get_me()
+
+        _, (_, names, values) = token_cache.get(self.token.key)
+
+        self.assertNotIn('password', names)
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(self.client.get(ME_URL).data['name'], self.user.name)
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token evicts it from the cache."""
+        self.get_me()
+
+        self.token.delete()
+
+        self.assertEqual(
+            self.get_me().status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user evicts their token from the cache."""
+        self.get_me()
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(
+            self.get_me().status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_password_change_invalidated(self):
+        """Test changing a password reloads the cached user."""
+        self.get_me()
+
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            res = self.get_me()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_expired_token_rejected(self):
+        """Test an expired token fails even when cached."""
+        self.get_me()
+        DeviceToken.objects.filter(id=self.token.id).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        token_cache.clear()
+
+        self.assertEqual(
+            self.get_me().status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_sliding_renewal(self):
+        """Test using an ageing token pushes its expiry forward once."""
+        old_expiry = timezone.now() + timedelta(days=1)
+        DeviceToken.objects.filter(id=self.token.id).update(
+            expires_at=old_expiry
+        )
+
+        with self.assertNumQueries(2):
+            self.get_me()
+        with self.assertNumQueries(0):
+            self.get_me()
+
+        self.token.refresh_from_db()
+        self.assertGreater(
+            self.token.expires_at,
+            timezone.now() + settings.AUTH_TOKEN_TTL - timedelta(minutes=1),
+        )
+
+    def test_rotate_token(self):
+        """Test rotating replaces the token for the same device."""
+        res = self.client.post(ROTATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token.key)
+        self.assertEqual(
+            self.get_me().status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        new_token = DeviceToken.objects.get(user=self.user)
+        self.assertEqual(new_token.key, res.data['token'])
+        self.assertEqual(new_token.device, 'phone')
+
+    def test_cleanup_tokens_command(self):
+        """Test cleanup deletes only expired tokens."""
+        expired = [
+            DeviceToken.issue(self.user, device=f'old-{i}') for i in range(5)
+        ]
+        DeviceToken.objects.filter(id__in=[t.id for t in expired]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        call_command(
+            'cleanup_tokens', batch_size=2, sleep=0, stdout=StringIO()
+        )
+
+        self.assertEqual(list(DeviceToken.objects.all()), [self.token])
+
+    def test_cleanup_tokens_deletes_legacy_tokens(self):
+        """Test cleanup empties the legacy authtoken table."""
+        for i in range(3):
+            user = get_user_model().objects.create_user(
+                email=f'legacy{i}@example.com', password='test123',
+            )
+            Token.objects.create(user=user)
+
+        call_command(
+            'cleanup_tokens', batch_size=2, sleep=0, stdout=StringIO()
+        )
+
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(list(DeviceToken.objects.all()), [self.token])
+
+    def test_login_reuses_device_token(self):
+        """Test logging in again keeps and renews the device's token."""
+        DeviceToken.objects.filter(id=self.token.id).update(
+            expires_at=timezone.now() + timedelta(days=1)
+        )
+
+        token = DeviceToken.issue(self.user, device='phone')
+
+        self.assertEqual(token.key, self.token.key)
+        self.assertGreater(
+            token.expires_at, timezone.now() + timedelta(days=2)
+        )
+        self.assertEqual(self.get_me().status_code, status.HTTP_200_OK)
+
+    def test_login_replaces_expired_device_token(self):
+        """Test logging in with an expired device token issues a new one."""
+        DeviceToken.objects.filter(id=self.token.id).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        token = DeviceToken.issue(self.user, device='phone')
+
+        self.assertNotEqual(token.key, self.token.key)
+        self.assertEqual(DeviceToken.objects.filter(user=self.user).count(), 1)
@@ -0,0 +1,157 @@
+"""
+Tests for the batch API.
+"""
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import ResolverMatch, resolve, reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.views import TagViewSet
+
+BATCH_URL = reverse('batch')
+RECIPES_PATH = reverse('recipe:recipe-list')
+TAGS_PATH = reverse('recipe:tag-list')
+ME_PATH = reverse('user:me')
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+class BatchApiTests(TestCase):
+    """Test the batch API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_batch_reads_and_writes(self):
+        """Test sub-requests run in order with the caller's authentication."""
+        payload = {
+            'requests': [
+                {'method': 'GET', 'path': ME_PATH},
+                {
+                    'method': 'POST',
+                    'path': RECIPES_PATH,
+                    'body': {
+                        'title': 'Soup', 'time_minutes': 10, 'price': '2.50',
+                    },
+                },
+                {'method': 'GET', 'path': f'{RECIPES_PATH}?fields=id,title'},
+                {'method': 'GET', 'path': '/api/missing/'},
+            ]
+        }
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        me, created, listing, missing = res.data['responses']
+        self.assertEqual(me['status'], status.HTTP_200_OK)
+        self.assertEqual(me['body']['email'], self.user.email)
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=created['body']['id'])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(recipe.price, Decimal('2.50'))
+        self.assertEqual(
+            listing['body']['results'], [{'id': recipe.id, 'title': 'Soup'}]
+        )
+        self.assertEqual(missing['status'], status.HTTP_404_NOT_FOUND)
+
+    def test_batch_anonymous_uses_sub_request_permissions(self):
+        """Test anonymous batches are still checked per sub-request."""
+        payload = {'requests': [{'method': 'GET', 'path': ME_PATH}]}
+
+        res = APIClient().post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['responses'][0]['status'], status.HTTP_401_UNAUTHORIZED
+        )
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_batch_size_limited(self):
+        """Test batches larger than the configured limit are rejected."""
+        payload = {'requests': [{'method': 'GET', 'path': TAGS_PATH}] * 3}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_async_views_rejected_per_item(self):
+        """Test async views are refused without being run."""
+        async_view = AsyncMock()
+        async_view.cls = TagViewSet
+        match = ResolverMatch(async_view, (), {})
+        payload = {
+            'requests': [
+                {'method': 'GET', 'path': RECIPES_PATH},
+                {'method': 'GET', 'path': TAGS_PATH},
+            ]
+        }
+
+        side_effect = [match, resolve(TAGS_PATH)]
+        with patch('core.views.resolve', side_effect=side_effect):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        rejected, tags = res.data['responses']
+        self.assertEqual(rejected['status'], status.HTTP_400_BAD_REQUEST)
+        async_view.assert_not_called()
+        self.assertEqual(tags['status'], status.HTTP_200_OK)
+
+    @patch('recipe.views.TagViewSet.list', side_effect=RuntimeError('boom'))
+    def test_sub_request_error_reported_per_item(self, mock_list):
+        """Test an unhandled error fails only its own sub-request."""
+        payload = {
+            'requests': [
+                {'method': 'GET', 'path': TAGS_PATH},
+                {'method': 'GET', 'path': ME_PATH},
+            ]
+        }
+
+        with self.assertLogs('core.views', level='ERROR'):
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tags, me = res.data['responses']
+        self.assertEqual(tags['status'], status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(me['status'], status.HTTP_200_OK)
+
+    def test_nested_batch_rejected(self):
+        """Test a batch cannot contain another batch."""
+        payload = {'requests': [{'method': 'POST', 'path': BATCH_URL}]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ParallelBatchApiTests(TransactionTestCase):
+    """Test running batched reads on the thread pool."""
+
+    def test_parallel_reads(self):
+        """Test parallel reads return responses in request order."""
+        user = create_user(email='user@example.com', password='test123')
+        Tag.objects.create(user=user, name='Vegan')
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            'parallel': True,
+            'requests': [
+                {'method': 'GET', 'path': TAGS_PATH},
+                {'method': 'GET', 'path': ME_PATH},
+            ],
+        }
+
+        res = client.post(BATCH_URL, payload, format='json')
+
+        tags, me = res.data['responses']
+        self.assertEqual(tags['body']['results'][0]['name'], 'Vegan')
+        self.assertEqual(me['body']['email'], user.email)
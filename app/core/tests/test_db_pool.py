@@ -0,0 +1,185 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.db import pool as pools
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.postgresql import base
+from core.db.postgresql.creation import test_aliases
+
+
+class FakeConnection:
+    """Stand-in DB-API connection recording whether it was closed."""
+
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    if not connection.healthy:
+        raise RuntimeError('connection lost')
+
+
+def make_pool(**kwargs):
+    options = {
+        'max_size': 2, 'timeout': 1, 'max_lifetime': 60,
+        'health_check_interval': 0, 'check': check,
+    }
+    options.update(kwargs)
+    return ConnectionPool(FakeConnection, **options)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the bounded connection pool."""
+
+    def test_released_connection_is_reused(self):
+        """Test a released connection is handed out again."""
+        pool = make_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['connections_created'], 1)
+
+    def test_acquire_times_out_when_exhausted(self):
+        """Test acquiring from a full pool fails after the timeout."""
+        pool = make_pool(max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_time_max'], 0)
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting caller receives the next released connection."""
+        pool = make_pool(max_size=1)
+        connection = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire())
+        )
+        waiter.start()
+
+        pool.release(connection)
+        waiter.join()
+
+        self.assertEqual(acquired, [connection])
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_connection_recycled_after_max_lifetime(self):
+        """Test connections older than max_lifetime are closed and replaced."""
+        pool = make_pool(max_lifetime=0)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['connections_recycled'], 1)
+
+    def test_unhealthy_connection_replaced(self):
+        """Test connections failing the health check are replaced."""
+        pool = make_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.healthy = False
+
+        replacement = pool.acquire()
+
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['health_check_failures'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_failed_reset_discards_connection(self):
+        """Test a connection that fails to reset is not reused."""
+        def reset(connection):
+            raise RuntimeError('rollback failed')
+
+        pool = make_pool(reset=reset)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class SharedPoolTests(SimpleTestCase):
+    """Test the process-wide pool registry."""
+
+    def setUp(self):
+        for name, value in (('_pools', {}), ('_inherited', [])):
+            patcher = patch.object(pools, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_pool_shared_by_key(self):
+        """Test callers asking for the same key get the same pool."""
+        pool = pools.shared_pool('default', 'a', make_pool)
+
+        self.assertIs(pools.shared_pool('default', 'a', make_pool), pool)
+        self.assertIsNot(pools.shared_pool('default', 'b', make_pool), pool)
+
+    def test_stats_summed_by_name(self):
+        """Test pools of the same name are reported together."""
+        first = pools.shared_pool('default', 'a', make_pool)
+        in_use = [first.acquire(), first.acquire()]
+        first.release(in_use.pop())
+        in_use.append(pools.shared_pool('default', 'b', make_pool).acquire())
+
+        stats = pools.pool_stats()['default']
+
+        self.assertEqual(
+            (stats['in_use'], stats['idle'], stats['size']), (2, 1, 3)
+        )
+
+    def test_forked_child_forgets_pools(self):
+        """Test a forked child opens new connections, leaving the parent's."""
+        pool = pools.shared_pool('default', 'a', make_pool)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        pools._forget_pools()
+
+        child_pool = pools.shared_pool('default', 'a', make_pool)
+        self.assertIsNot(child_pool, pool)
+        self.assertIsNot(child_pool.acquire(), connection)
+        self.assertFalse(connection.closed)
+        self.assertEqual(pools.pool_stats()['default']['size'], 1)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test the pooled PostgreSQL backend's handling of test databases."""
+
+    def test_test_database_connections_not_pooled(self):
+        """Test connections to a test database are closed, not kept idle."""
+        wrapper = base.DatabaseWrapper({
+            'NAME': 'test_app', 'USER': '', 'PASSWORD': '', 'HOST': '',
+            'PORT': '',
+            'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0,
+            'AUTOCOMMIT': True,
+        }, alias='pool_test')
+        connection = FakeConnection()
+        test_aliases.add('pool_test')
+        self.addCleanup(test_aliases.discard, 'pool_test')
+
+        with patch.object(
+            base.base.DatabaseWrapper, 'get_new_connection',
+            return_value=connection,
+        ):
+            wrapper.connection = wrapper.get_new_connection({})
+        wrapper.close()
+
+        self.assertIsNone(wrapper._pool)
+        self.assertTrue(connection.closed)
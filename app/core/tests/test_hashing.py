@@ -0,0 +1,124 @@
+"""
+Tests for password hashing timing and the async login and signup views.
+"""
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashing import HashingPool
+from core.models import DeviceToken
+
+TOKEN_URL = reverse('user:token')
+ASYNC_TOKEN_URL = reverse('user:async-token')
+ASYNC_CREATE_USER_URL = reverse('user:async-create')
+
+
+class HashingTests(TestCase):
+    """Test password hashing for the sync and async views."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {'email': 'test@example.com', 'password': 'testpass123'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+
+    def test_login_reports_hashing_time(self):
+        """Test login reports hashing time in a Server-Timing header."""
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertRegex(res['Server-Timing'], r'^hash;dur=\d+\.\d(, |$)')
+
+    def test_async_login(self):
+        """Test the async login returns the device's token."""
+        res = self.client.post(
+            ASYNC_TOKEN_URL, {**self.payload, 'device': 'phone'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        token = DeviceToken.objects.get(user=self.user, device='phone')
+        self.assertEqual(res.json()['token'], token.key)
+        self.assertRegex(res['Server-Timing'], r'^hash;dur=\d+\.\d(, |$)')
+
+    def test_async_login_bad_credentials(self):
+        """Test the async login rejects wrong passwords and unknown users."""
+        wrong = self.client.post(
+            ASYNC_TOKEN_URL, {**self.payload, 'password': 'wrong'}
+        )
+        unknown = self.client.post(
+            ASYNC_TOKEN_URL, {**self.payload, 'email': 'no@example.com'}
+        )
+
+        self.assertEqual(wrong.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(unknown.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', wrong.json())
+        self.assertFalse(DeviceToken.objects.exists())
+
+    def test_async_signup(self):
+        """Test the async signup creates a user with a usable password."""
+        payload = {
+            'email': 'new@example.com',
+            'password': 'testpass123',
+            'name': 'New',
+        }
+
+        res = self.client.post(ASYNC_CREATE_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('password', res.json())
+        user = get_user_model().objects.get(email='new@example.com')
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_async_signup_invalid(self):
+        """Test the async signup reports validation errors."""
+        res = self.client.post(ASYNC_CREATE_USER_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', res.json())
+
+    def test_saturated_pool_returns_503(self):
+        """Test async login and signup fail fast when the pool is full."""
+        pool = HashingPool(max_workers=1, max_pending=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+
+        try:
+            with patch('core.hashing._pool', pool):
+                login = self.client.post(ASYNC_TOKEN_URL, self.payload)
+                signup = self.client.post(
+                    ASYNC_CREATE_USER_URL,
+                    {
+                        'email': 'new@example.com',
+                        'password': 'testpass123',
+                        'name': 'New',
+                    },
+                )
+        finally:
+            release.set()
+
+        self.assertEqual(
+            login.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(
+            signup.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(email='new@example.com').exists()
+        )
+
+    def test_saturated_pool_does_not_affect_sync_hashing(self):
+        """Test sync callers hash inline whatever the pool's state."""
+        pool = HashingPool(max_workers=1, max_pending=0)
+        release = threading.Event()
+        pool.submit(release.wait)
+
+        try:
+            with patch('core.hashing._pool', pool):
+                self.assertTrue(self.user.check_password('testpass123'))
+        finally:
+            release.set()
@@ -0,0 +1,162 @@
+"""
+Tests for request metrics.
+"""
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class MetricsTests(TestCase):
+    """Test recording and exposing request metrics."""
+
+    def setUp(self):
+        patcher = patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+    def test_requests_recorded_by_view(self):
+        """Test status, latency and database time are labelled by view name."""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        body = res.content.decode()
+        self.assertEqual(
+            res['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8'
+        )
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'view="recipe:recipe-list"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{method="GET",view="recipe:recipe-list"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_request_db_seconds_bucket'
+            '{view="recipe:recipe-list",le="+Inf"} 1',
+            body,
+        )
+        self.assertIn('http_requests_in_flight 1', body)
+
+    def test_processes_aggregated(self):
+        """Test metrics of other processes in METRICS_DIR are summed."""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory), \
+                patch.object(metrics.registry, '_start_flusher'):
+            labels = [
+                ['method', 'GET'],
+                ['status', '200'],
+                ['view', 'recipe:recipe-list'],
+            ]
+            other = {
+                'http_requests_total': [[labels, 2]],
+                'http_requests_in_flight': [[[], 5]],
+            }
+            path = os.path.join(directory, 'metrics-999999999.json')
+            with open(path, 'w') as file:
+                json.dump({'pid': 999999999, 'metrics': other}, file)
+            self.client.get(RECIPES_URL)
+
+            body = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'view="recipe:recipe-list"} 3',
+            body,
+        )
+        # The other process has exited, so its in-flight requests are dropped.
+        self.assertIn('http_requests_in_flight 1', body)
+
+    def test_database_pool_metrics(self):
+        """Test connection pool usage is exposed per database."""
+        stats = {'default': {
+            'idle': 3, 'in_use': 2, 'waits': 4, 'wait_time_total': 1.5,
+            'timeouts': 1,
+        }}
+        with patch.object(metrics, 'pool_stats', return_value=stats):
+            body = self.client.get(METRICS_URL).content.decode()
+
+        self.assertIn(
+            'db_pool_connections{database="default",state="idle"} 3', body
+        )
+        self.assertIn(
+            'db_pool_connections{database="default",state="in_use"} 2', body
+        )
+        self.assertIn('db_pool_waits_total{database="default"} 4', body)
+        self.assertIn(
+            'db_pool_wait_seconds_total{database="default"} 1.5', body
+        )
+        self.assertIn('db_pool_timeouts_total{database="default"} 1', body)
+
+    def test_exited_processes_retired(self):
+        """Test files of exited processes are folded into one and deleted."""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory), \
+                patch.object(metrics.registry, '_start_flusher'):
+            labels = [
+                ['method', 'GET'],
+                ['status', '200'],
+                ['view', 'recipe:recipe-list'],
+            ]
+            other = {
+                'http_requests_total': [[labels, 2]],
+                'http_requests_in_flight': [[[], 5]],
+            }
+            path = os.path.join(directory, 'metrics-999999999.json')
+            with open(path, 'w') as file:
+                json.dump({'pid': 999999999, 'metrics': other}, file)
+
+            self.client.get(METRICS_URL)
+            body = self.client.get(METRICS_URL).content.decode()
+            files = os.listdir(directory)
+
+        self.assertNotIn('metrics-999999999.json', files)
+        self.assertIn('metrics-retired.json', files)
+        self.assertIn(
+            'http_requests_total{method="GET",status="200",'
+            'view="recipe:recipe-list"} 2',
+            body,
+        )
+        self.assertIn('http_requests_in_flight 1', body)
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_ALLOWED_IPS=[])
+    def test_scrape_requires_token(self):
+        """Test scrapers from other addresses must send the token."""
+        missing = self.client.get(METRICS_URL)
+        wrong = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer nope')
+        right = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        )
+
+        self.assertEqual(missing.status_code, 403)
+        self.assertEqual(wrong.status_code, 403)
+        self.assertEqual(right.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None, METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_scrape_allowed_ips(self):
+        """Test only the allowed addresses may scrape without a token."""
+        denied = self.client.get(METRICS_URL)
+        allowed = self.client.get(METRICS_URL, REMOTE_ADDR='10.0.0.5')
+
+        self.assertEqual(denied.status_code, 403)
+        self.assertEqual(allowed.status_code, 200)
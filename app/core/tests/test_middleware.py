@@ -0,0 +1,55 @@
+"""
+Tests for the middleware helper.
+"""
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.middleware import request_hook
+
+
+@request_hook
+def header_middleware(request):
+    """Record the hook's steps on the request and tag the response."""
+    request.steps = ['before']
+    try:
+        response = yield
+    finally:
+        request.steps.append('cleanup')
+    response['X-Hooked'] = 'yes'
+
+
+class RequestHookTests(SimpleTestCase):
+    """Test middleware built with request_hook."""
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_sync_response_passed_to_hook(self):
+        """Test the hook wraps a sync chain and may change the response."""
+        middleware = header_middleware(lambda request: HttpResponse())
+
+        response = middleware(self.request)
+
+        self.assertEqual(response['X-Hooked'], 'yes')
+        self.assertEqual(self.request.steps, ['before', 'cleanup'])
+
+    def test_async_response_passed_to_hook(self):
+        """Test the hook wraps an async chain and may change the response."""
+        async def get_response(request):
+            return HttpResponse()
+
+        response = async_to_sync(header_middleware(get_response))(self.request)
+
+        self.assertEqual(response['X-Hooked'], 'yes')
+        self.assertEqual(self.request.steps, ['before', 'cleanup'])
+
+    def test_exception_raised_in_hook(self):
+        """Test an exception from the chain runs the cleanup and propagates."""
+        def get_response(request):
+            raise ValueError('view failed')
+
+        with self.assertRaisesMessage(ValueError, 'view failed'):
+            header_middleware(get_response)(self.request)
+
+        self.assertEqual(self.request.steps, ['before', 'cleanup'])
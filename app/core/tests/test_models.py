@@ -3,7 +3,9 @@ Tests for models.
 """
 from unittest.mock import patch
 from decimal import Decimal
+from io import StringIO
 
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -97,3 +99,208 @@ class ModelTests(TestCase):
         file_path = models.recipe_image_file_path(None, 'example.jpg')
 
         self.assertEqual(file_path, f'uploads/recipe/{uuid}.jpg')
+
+    def test_comment_reply_path_and_count(self):
+        """Test replies extend the parent's path and update its reply count."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        root = models.Comment.objects.create(
+            user=user, recipe=recipe, content='Root'
+        )
+        reply = models.Comment.objects.create(
+            user=user, recipe=recipe, parent=root, content='Reply',
+        )
+        nested = models.Comment.objects.create(
+            user=user, recipe=recipe, parent=reply, content='Nested',
+        )
+        other = models.Comment.objects.create(
+            user=user, recipe=recipe, content='Other'
+        )
+
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+        self.assertEqual(nested.depth, 2)
+        self.assertTrue(nested.path.startswith(reply.path))
+        self.assertEqual(list(root.thread()), [root, reply, nested])
+        self.assertNotIn(other, root.thread())
+
+        nested.delete()
+        reply.refresh_from_db()
+        self.assertEqual(reply.reply_count, 0)
+
+    def test_comment_id_longer_than_path_step_rejected(self):
+        """Test a comment whose ID does not fit its path is not saved."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        pk = 10 ** models.Comment.PATH_STEP
+
+        with self.assertRaises(ValueError):
+            models.Comment.objects.create(
+                pk=pk, user=user, recipe=recipe, content='Root'
+            )
+
+        self.assertFalse(models.Comment.objects.filter(pk=pk).exists())
+
+    def test_comment_queryset_delete_updates_reply_count(self):
+        """Test deleting replies through a queryset keeps reply counts."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        root = models.Comment.objects.create(
+            user=user, recipe=recipe, content='Root'
+        )
+        for i in range(3):
+            models.Comment.objects.create(
+                user=user, recipe=recipe, parent=root, content=f'Reply {i}',
+            )
+
+        models.Comment.objects.filter(
+            parent=root, content__in=['Reply 0', 'Reply 1']
+        ).delete()
+
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+    def test_comment_first_replies_limited_per_root(self):
+        """Test first_replies returns the first replies of each root only."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        roots = [
+            models.Comment.objects.create(
+                user=user, recipe=recipe, content=f'Root {i}'
+            )
+            for i in range(2)
+        ]
+        replies = {
+            root.id: [
+                models.Comment.objects.create(
+                    user=user, recipe=recipe, parent=root,
+                    content=f'Reply {i}',
+                )
+                for i in range(4)
+            ]
+            for root in roots
+        }
+        for root in roots:
+            root.refresh_from_db()
+
+        first = models.Comment.first_replies(roots, 2)
+
+        self.assertEqual(
+            first, {root.id: replies[root.id][:2] for root in roots}
+        )
+
+    def test_rating_histogram_tracks_changes(self):
+        """Test the histogram follows rating inserts, updates and deletes."""
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        rating = models.Rating.objects.create(
+            user=user, recipe=recipe, score=3
+        )
+        models.Rating.objects.create(user=other_user, recipe=recipe, score=5)
+        rating.score = 1
+        rating.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.rating_histogram, {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}
+        )
+        self.assertEqual(recipe.average_rating, Decimal('3.00'))
+
+        rating.delete()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ratings_count, 1)
+        self.assertEqual(recipe.average_rating, Decimal('5.00'))
+
+    def test_rating_histogram_follows_cascade_deletes(self):
+        """Test deleting a user removes their ratings from recipe summaries."""
+        user = create_user()
+        rater = create_user(email='rater@example.com')
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        models.Rating.objects.create(user=user, recipe=recipe, score=4)
+        models.Rating.objects.create(user=rater, recipe=recipe, score=2)
+
+        rater.delete()
+
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0}
+        )
+        self.assertEqual(recipe.average_rating, Decimal('4.00'))
+
+    def test_recipe_delete_skips_its_rating_summary(self):
+        """Test deleting a recipe does not update its summary per rating."""
+        user = create_user()
+        rater = create_user(email='rater@example.com')
+        recipes = [
+            models.Recipe.objects.create(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('10.00'),
+            )
+            for i in range(2)
+        ]
+        for recipe in recipes:
+            models.Rating.objects.create(user=user, recipe=recipe, score=4)
+            models.Rating.objects.create(user=rater, recipe=recipe, score=2)
+
+        with patch.object(models.Recipe, 'apply_rating_change') as apply:
+            recipes[0].delete()
+        apply.assert_not_called()
+
+        rater.delete()
+        recipes[1].refresh_from_db()
+        self.assertEqual(
+            recipes[1].rating_histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0}
+        )
+
+    def test_reconcile_ratings_fixes_queryset_updates(self):
+        """Test reconcile_ratings repairs summaries after a queryset update."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('10.00'),
+        )
+        models.Rating.objects.create(user=user, recipe=recipe, score=4)
+        models.Rating.objects.filter(recipe=recipe).update(score=2)
+
+        call_command('reconcile_ratings', stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0}
+        )
+        self.assertEqual(recipe.average_rating, Decimal('2.00'))
@@ -0,0 +1,154 @@
+"""
+Tests for on-demand request profiling.
+"""
+import asyncio
+import os
+import pstats
+import tempfile
+import threading
+import time
+
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import DeviceToken
+from core.profiling import StackSampler, profiles_dir, profiling_middleware
+
+RECIPES_URL = reverse('recipe:recipe-list')
+PROFILES_URL = reverse('admin-profiles')
+
+
+def profile_download_url(name):
+    return reverse('admin-profile-download', args=[name])
+
+
+class ProfilingTests(TestCase):
+    """Test profiling requests and listing profiles."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='testpass123',
+        )
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        token = DeviceToken.issue(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_staff_request_profiled(self):
+        """Test a staff request with ?profile=1 saves a cProfile dump."""
+        self.authenticate(self.staff)
+
+        res = self.client.get(RECIPES_URL, {'profile': '1'})
+
+        self.assertEqual(res.status_code, 200)
+        name = res['X-Profile']
+        self.assertTrue(name.endswith('.pstats'))
+        stats = pstats.Stats(os.path.join(profiles_dir(), name))
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_sampling_profile_via_header(self):
+        """Test the X-Profile header selects the sampling profiler."""
+        self.authenticate(self.staff)
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='sampling')
+
+        self.assertTrue(res['X-Profile'].endswith('.collapsed'))
+        self.assertTrue(
+            os.path.isfile(os.path.join(profiles_dir(), res['X-Profile']))
+        )
+
+    def test_non_staff_request_not_profiled(self):
+        """Test profiling is ignored for users who are not staff."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.authenticate(user)
+
+        res = self.client.get(RECIPES_URL, {'profile': '1'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('X-Profile', res)
+        self.assertFalse(os.path.exists(profiles_dir()))
+
+    def test_admin_lists_profiles(self):
+        """Test staff can list and download saved profiles."""
+        self.authenticate(self.staff)
+        name = self.client.get(RECIPES_URL, {'profile': '1'})['X-Profile']
+        self.client.force_login(self.staff)
+
+        res = self.client.get(PROFILES_URL)
+        download = self.client.get(profile_download_url(name))
+        traversal = self.client.get(profile_download_url('..'))
+
+        self.assertContains(res, profile_download_url(name))
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(traversal.status_code, 404)
+
+
+def busy_view():
+    return sum(range(10000))
+
+
+class AsyncProfilingTests(SimpleTestCase):
+    """Test profiling requests served under ASGI."""
+
+    def test_sync_work_of_async_request_profiled(self):
+        """Test the profile covers view code run in the sync thread."""
+        async def get_response(request):
+            await sync_to_async(busy_view)()
+            return HttpResponse()
+
+        request = RequestFactory().get('/', {'profile': '1'})
+        request.user = SimpleNamespace(
+            is_staff=True, email='admin@example.com'
+        )
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(MEDIA_ROOT=directory):
+            response = asyncio.run(profiling_middleware(get_response)(request))
+            stats = pstats.Stats(
+                os.path.join(profiles_dir(), response['X-Profile'])
+            )
+
+        self.assertIn(
+            'busy_view', [function for _, _, function in stats.stats]
+        )
+
+
+class StackSamplerTests(SimpleTestCase):
+    """Test sampling a thread's stacks."""
+
+    def test_samples_collapsed_stacks(self):
+        """Test sampled stacks name the running functions, outermost first."""
+        done = threading.Event()
+
+        def busy_worker():
+            while not done.is_set():
+                time.sleep(0.001)
+
+        worker = threading.Thread(target=busy_worker)
+        worker.start()
+        sampler = StackSampler(worker.ident, 0.001)
+        sampler.start()
+        time.sleep(0.05)
+        sampler.stop()
+        done.set()
+        worker.join()
+
+        stack, count = sampler.collapsed().splitlines()[0].rsplit(' ', 1)
+        self.assertIn('busy_worker (', stack.split(';')[-1])
+        self.assertGreater(int(count), 0)
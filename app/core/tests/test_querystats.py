@@ -0,0 +1,82 @@
+"""
+Tests for per-request query stats.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.querystats import fingerprint, record_queries
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FingerprintTests(SimpleTestCase):
+    """Test normalizing SQL into fingerprints."""
+
+    def test_literals_and_lists_collapsed(self):
+        """Test values and IN lists of any length share a fingerprint."""
+        self.assertEqual(
+            fingerprint(
+                'SELECT * FROM t WHERE a = %s AND b IN (%s, %s)  LIMIT 21'
+            ),
+            fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (1) LIMIT 5"),
+        )
+
+
+class RecordQueriesTests(TestCase):
+    """Test collecting query stats."""
+    databases = {'default', 'lagging_replica'}
+
+    def test_repeated_queries_reported(self):
+        """Test the same query run with different values counts as a repeat."""
+        with record_queries() as stats:
+            for user_id in (1, 2, 3):
+                get_user_model().objects.filter(id=user_id).exists()
+
+        self.assertEqual(stats.count, 3)
+        self.assertGreaterEqual(stats.duration, 0)
+        [(sql, count)] = stats.duplicates()
+        self.assertEqual(count, 3)
+        self.assertIn('WHERE "core_user"."id" = ?', sql)
+
+    @override_settings(DATABASE_SHARDS=['default', 'lagging_replica'])
+    def test_query_on_each_shard_not_repeated(self):
+        """Test running a query once per shard is not reported as a repeat."""
+        with record_queries() as stats:
+            for alias in ('default', 'lagging_replica'):
+                get_user_model().objects.using(alias).filter(id=1).exists()
+
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.duplicates(), [])
+
+
+class QueryStatsMiddlewareTests(TestCase):
+    """Test the per-request query report."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                email='user@example.com', password='pass123'
+            )
+        )
+
+    @override_settings(QUERY_REPEATS_SAMPLE_RATE=1)
+    def test_sampled_request_checked_for_repeats(self):
+        """Test sampled requests fingerprint their queries."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertTrue(res.wsgi_request.query_stats.fingerprints)
+
+    @override_settings(QUERY_REPEATS_SAMPLE_RATE=0)
+    def test_unsampled_request_not_fingerprinted(self):
+        """Test other requests only count and time their queries."""
+        res = self.client.get(RECIPES_URL)
+
+        stats = res.wsgi_request.query_stats
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertGreater(stats.count, 0)
+        self.assertFalse(stats.fingerprints)
@@ -0,0 +1,97 @@
+"""
+Tests for the JSON and MessagePack renderers and parsers.
+"""
+import io
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser, MessagePackParser
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+PAYLOAD = {
+    'id': 1,
+    'price': Decimal('5.25'),
+    'created_at': datetime(2024, 7, 7, 16, 29, 3, 123456, tzinfo=timezone.utc),
+    'date': date(2024, 7, 7),
+    'image': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'title': 'Crème brûlée  ',
+    'label': gettext_lazy('Recipe'),
+    'tags': [{'id': 1, 'name': 'Dessert'}],
+    'link': None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the fast JSON renderer."""
+
+    def test_matches_stdlib_renderer(self):
+        """Test output is byte-identical to DRF's JSONRenderer."""
+        expected = JSONRenderer().render(PAYLOAD)
+
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), expected)
+
+    def test_indent_uses_stdlib_renderer(self):
+        """Test pretty printing falls back to the stdlib encoder."""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, media_type),
+            JSONRenderer().render(PAYLOAD, media_type),
+        )
+
+    @patch('core.renderers.orjson', None)
+    def test_fallback_without_orjson(self):
+        """Test the stdlib encoder is used when orjson is unavailable."""
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD)
+        )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the fast JSON parser."""
+
+    def test_parse(self):
+        """Test parsing a JSON request body."""
+        stream = io.BytesIO('{"title": "Crème", "price": "5.25"}'.encode())
+
+        data = FastJSONParser().parse(stream)
+
+        self.assertEqual(data, {'title': 'Crème', 'price': '5.25'})
+
+    def test_parse_error(self):
+        """Test invalid JSON raises a ParseError."""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+
+class MessagePackTests(SimpleTestCase):
+    """Test the MessagePack renderer and parser."""
+
+    def test_round_trip_is_lossless(self):
+        """Test Decimals and datetimes survive a render/parse round trip."""
+        data = {
+            'price': Decimal('5.25'),
+            'average_rating': Decimal('4.10'),
+            'created_at': PAYLOAD['created_at'],
+            'tags': [{'id': 1, 'name': 'Dessert'}],
+        }
+
+        rendered = MessagePackRenderer().render(data)
+        parsed = MessagePackParser().parse(io.BytesIO(rendered))
+
+        self.assertEqual(parsed, data)
+        self.assertEqual(str(parsed['average_rating']), '4.10')
+
+    def test_parse_error(self):
+        """Test a truncated body raises a ParseError."""
+        rendered = MessagePackRenderer().render({'title': 'Soup'})
+
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(rendered[:-2]))
@@ -0,0 +1,177 @@
+"""
+Tests for the primary/replica database router.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings,
+)
+from django.http import HttpResponse
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import models
+from core.routers import (
+    PrimaryReplicaRouter,
+    bind_user,
+    replica_pinning_middleware,
+)
+
+router = PrimaryReplicaRouter()
+
+
+def handle(read=False, write=False, user_id=None, method='get', cookies=None):
+    """Run a request through the middleware, recording where reads went."""
+    reads = []
+    responses = []
+
+    def view(request):
+        if user_id is not None:
+            bind_user(user_id)
+        if write:
+            router.db_for_write(models.Recipe)
+        if read:
+            reads.append(router.db_for_read(models.Recipe))
+        return HttpResponse()
+
+    request = getattr(RequestFactory(), method)('/')
+    request.COOKIES.update(cookies or {})
+    responses.append(replica_pinning_middleware(view)(request))
+    handle.response = responses[0]
+    return reads
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=60)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Test routing reads and writes between primary and replicas."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        """Test reads use a replica while writes use the primary."""
+        self.assertEqual(router.db_for_read(models.Recipe), 'replica1')
+        self.assertEqual(router.db_for_write(models.Recipe), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_use_primary_without_replicas(self):
+        """Test reads stay on the primary when no replicas are configured."""
+        self.assertEqual(router.db_for_read(models.Recipe), 'default')
+
+    def test_primary_models_read_from_primary(self):
+        """Test DATABASE_PRIMARY_MODELS are always read from the primary."""
+        self.assertEqual(router.db_for_read(models.DeviceToken), 'default')
+
+    def test_reads_after_write_in_request_use_primary(self):
+        """Test a request reads from the primary once it has written."""
+        self.assertEqual(handle(read=True, write=True), ['default'])
+
+    def test_unsafe_requests_read_from_primary(self):
+        """Test unsafe requests read from the primary before any write."""
+        for method in ('post', 'put', 'patch', 'delete'):
+            self.assertEqual(handle(read=True, method=method), ['default'])
+
+    def test_client_reads_stick_to_primary_after_write(self):
+        """Test a pin cookie keeps a client's later reads on the primary."""
+        handle(write=True)
+        cookie = handle.response.cookies[settings.REPLICA_PIN_COOKIE]
+
+        self.assertEqual(cookie['max-age'], 60)
+        self.assertEqual(
+            handle(
+                read=True,
+                cookies={settings.REPLICA_PIN_COOKIE: cookie.value},
+            ),
+            ['default'],
+        )
+        self.assertEqual(handle(read=True), ['replica1'])
+
+    @override_settings(REPLICA_PIN_CACHE_ALIAS='default')
+    def test_user_reads_stick_to_primary_after_write(self):
+        """Test a shared pin cache keeps a user reading from the primary."""
+        handle(write=True, user_id=1)
+
+        self.assertEqual(handle(read=True, user_id=1), ['default'])
+        self.assertEqual(handle(read=True, user_id=2), ['replica1'])
+
+    @override_settings(
+        REPLICA_STICKY_SECONDS=0, REPLICA_PIN_CACHE_ALIAS='default',
+    )
+    def test_stickiness_expires(self):
+        """Test reads return to the replicas after the sticky window."""
+        handle(write=True, user_id=1)
+
+        self.assertEqual(handle(read=True, user_id=1), ['replica1'])
+
+
+# Sharded models are always read from their shard, never a replica.
+@override_settings(
+    DATABASE_REPLICAS=['lagging_replica'], DATABASE_SHARDS=['default'],
+)
+class LaggingReplicaTests(TransactionTestCase):
+    """Test requests against a real replica database that has not caught up.
+
+    Not a TestCase: reads inside its transaction would all use the primary.
+    ``lagging_replica`` is added by ``core.tests.runner.ShardedTestRunner``.
+    """
+    databases = {'default', 'lagging_replica'}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='test123',
+        )
+        self.recipe = models.Recipe.objects.create(
+            user=self.user, title='Fresh', time_minutes=5,
+            price=Decimal('5.00'),
+        )
+        # The replica holds the same rows as they were before the last change.
+        self.user.save(using='lagging_replica')
+        models.Recipe.objects.using('lagging_replica').create(
+            id=self.recipe.id, user=self.user, title='Stale', time_minutes=5,
+            price=Decimal('5.00'),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def replica_recipe(self):
+        return models.Recipe.objects.using('lagging_replica').get(
+            id=self.recipe.id
+        )
+
+    def test_reads_use_replica(self):
+        """Test safe requests read from the replica."""
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+
+        self.assertEqual(res.data['title'], 'Stale')
+
+    def test_update_reads_and_writes_primary(self):
+        """Test a PATCH modifies the primary's current row, not the replica."""
+        res = self.client.patch(
+            reverse('recipe:recipe-detail', args=[self.recipe.id]),
+            {'time_minutes': 10},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db(using='default')
+        self.assertEqual(
+            (self.recipe.title, self.recipe.time_minutes), ('Fresh', 10)
+        )
+        self.assertEqual(self.replica_recipe().time_minutes, 5)
+
+    def test_rating_counters_written_to_primary(self):
+        """Test rating updates the primary's histogram."""
+        res = self.client.post(
+            reverse('recipe:recipe-rate', args=[self.recipe.id]), {'score': 4},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db(using='default')
+        self.assertEqual(self.recipe.ratings_count, 1)
+        self.assertEqual(self.replica_recipe().ratings_count, 0)
@@ -0,0 +1,78 @@
+"""
+Tests for the seed_data command.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.management.commands.seed_data import Command
+from core.models import Recipe, Rating, Follow
+from messaging.models import Conversation, Message
+
+SIZES = {
+    'users': 30, 'recipes': 40, 'tags': 6, 'ingredients': 12, 'likes': 150,
+    'ratings': 100, 'follows': 60, 'conversations': 8, 'messages': 60,
+    'chunk_size': 15, 'seed': 7, 'workers': 1,
+}
+
+
+def seed():
+    call_command('seed_data', stdout=StringIO(), **SIZES)
+
+
+def snapshot():
+    return [
+        (recipe.title, recipe.user.email, recipe.ratings_count,
+         sorted(recipe.likes.values_list('email', flat=True)))
+        for recipe in Recipe.objects.order_by('id')
+    ]
+
+
+class SeedDataTests(TestCase):
+    """Test the seed_data command."""
+
+    def test_seed_data_sizes(self):
+        """Test the requested numbers of rows are generated."""
+        seed()
+
+        self.assertEqual(get_user_model().objects.count(), 30)
+        self.assertEqual(Recipe.objects.count(), 40)
+        self.assertEqual(Conversation.objects.count(), 8)
+        self.assertTrue(Message.objects.exists())
+        self.assertFalse(
+            Follow.objects.filter(follower=F('followee')).exists()
+        )
+
+    def test_seed_data_rating_counters(self):
+        """Test denormalized rating counters match the ratings."""
+        seed()
+
+        total = Recipe.objects.aggregate(total=Sum('ratings_count'))['total']
+        self.assertEqual(total, Rating.objects.count())
+        recipe = Recipe.objects.order_by('-ratings_count').first()
+        self.assertEqual(recipe.ratings_count, recipe.ratings.count())
+        self.assertEqual(
+            recipe.rating_5_count, recipe.ratings.filter(score=5).count()
+        )
+
+    def test_seed_data_deterministic(self):
+        """Test the same seed generates the same data."""
+        seed()
+        first = snapshot()
+        get_user_model().objects.all().delete()
+        Conversation.objects.all().delete()
+
+        seed()
+
+        self.assertEqual(snapshot(), first)
+
+    def test_parallel_load_refused_in_transaction(self):
+        """Test workers are not forked while a transaction is open."""
+        jobs = [('users', 0, 1, {}), ('users', 1, 2, {})]
+
+        with self.assertRaisesMessage(CommandError, 'use --workers 1'):
+            Command()._run(jobs, workers=2)
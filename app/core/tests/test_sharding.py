@@ -0,0 +1,160 @@
+"""
+Tests for user-id sharding of recipes and messages.
+
+The API tests need two or more shards, e.g. DB_SHARD_HOSTS pointing at a
+second local database.
+"""
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.signals import post_delete, post_save
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Rating, Comment, Follow, ShardBucket, Tag
+from core.sharding import ShardedViewMixin, bucket_for_user, shard_map
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_user(email='user@example.com'):
+    return get_user_model().objects.create_user(
+        email=email, password='testpass123'
+    )
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ShardMapTests(TestCase):
+    """Test the bucket to shard map."""
+
+    def setUp(self):
+        shard_map.invalidate()
+        self.addCleanup(shard_map.invalidate)
+
+    def test_unmapped_bucket_uses_default(self):
+        """Test users in buckets without a mapping live on default."""
+        self.assertEqual(shard_map.shard_for_user(7), 'default')
+
+    def test_mapped_bucket_uses_shard(self):
+        """Test moving a bucket is picked up by the map."""
+        ShardBucket.objects.create(bucket=bucket_for_user(7), shard='shard1')
+
+        self.assertEqual(shard_map.shard_for_user(7), 'shard1')
+
+
+class MirrorSignalTests(SimpleTestCase):
+    """Test which models are copied to every shard."""
+
+    def test_other_models_not_mirrored(self):
+        """Test models outside REFERENCE_MODELS get no mirroring receivers."""
+        self.assertFalse(post_save.has_listeners(Follow))
+        self.assertFalse(post_delete.has_listeners(Follow))
+
+
+@skipUnless(len(settings.DATABASE_SHARDS) > 1, 'Needs two or more shards.')
+class ShardedApiTests(TestCase):
+    """Test the recipe API across shards."""
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self):
+        shard_map.invalidate()
+        self.addCleanup(shard_map.invalidate)
+        self.shard = settings.DATABASE_SHARDS[1]
+        self.user = create_user()
+        ShardBucket.objects.create(
+            bucket=bucket_for_user(self.user.id), shard=self.shard
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reference_rows_mirrored(self):
+        """Test users and tags are copied to every shard."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertTrue(
+            get_user_model().objects.using(self.shard)
+            .filter(pk=self.user.pk).exists()
+        )
+        self.assertTrue(
+            Tag.objects.using(self.shard).filter(pk=tag.pk).exists()
+        )
+
+    def test_create_recipe_on_owner_shard(self):
+        """Test a new recipe and its tags are stored on the owner's shard."""
+        payload = {
+            'title': 'Curry', 'time_minutes': 30, 'price': '7.50',
+            'tags': [{'name': 'Indian'}],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.using(self.shard).get(title='Curry')
+        self.assertEqual([tag.name for tag in recipe.tags.all()], ['Indian'])
+        self.assertFalse(Recipe.objects.using('default').exists())
+
+    def test_list_merges_shards(self):
+        """Test the list merges all shards newest first with keyset pages."""
+        other = create_user(email='other@example.com')
+        for recipe_id in (1, 3):
+            create_recipe(other, id=recipe_id)
+        for recipe_id in (2, 4):
+            create_recipe(self.user, id=recipe_id)
+
+        with patch.object(ShardedViewMixin, 'sharded_page_size', 3):
+            res = self.client.get(RECIPES_URL)
+            second = self.client.get(res.data['next'])
+
+        self.assertEqual([r['id'] for r in res.data['results']], [4, 3, 2])
+        self.assertEqual([r['id'] for r in second.data['results']], [1])
+        self.assertIsNone(second.data['next'])
+
+    def test_rate_recipe_on_shard(self):
+        """Test detail routes get the recipe and write ratings to its shard."""
+        recipe = create_recipe(self.user)
+        url = reverse('recipe:recipe-rate', args=[recipe.id])
+
+        res = self.client.post(url, {'score': 4})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            Rating.objects.using(self.shard)
+            .filter(recipe_id=recipe.id).exists()
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.rating_4_count, 1)
+
+    def test_reshard_moves_bucket(self):
+        """Test resharding copies a bucket's recipes and flips its shard."""
+        other = create_user(email='other@example.com')
+        recipe = create_recipe(other)
+        Rating.objects.create(user=self.user, recipe=recipe, score=5)
+        Comment.objects.create(user=self.user, recipe=recipe, content='Nice')
+        bucket = bucket_for_user(other.id)
+
+        call_command('reshard', str(bucket), '--to', self.shard)
+
+        self.assertEqual(shard_map.shard_for_user(other.id), self.shard)
+        moved = Recipe.objects.using(self.shard).get(pk=recipe.pk)
+        self.assertEqual(moved.ratings.count(), 1)
+        self.assertEqual(moved.comments.count(), 1)
+        self.assertFalse(
+            Recipe.objects.using('default').filter(pk=recipe.pk).exists()
+        )
+        self.assertFalse(Rating.objects.using('default').exists())
@@ -0,0 +1,69 @@
+"""
+Tests for the slow query recorder.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, SlowQuery
+from core.slowqueries import recorder
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class SlowQueryTests(TestCase):
+    """Test recording slow queries."""
+
+    def setUp(self):
+        # Save inline rather than from the recorder thread.
+        patcher = patch.object(recorder, 'submit', recorder.save)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        settings_override = override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='testpass123',
+        )
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='2.00',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_queries_aggregated_by_view(self):
+        """Test the recipe list's queries are aggregated with plans."""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        queries = SlowQuery.objects.filter(view='recipe:recipe-list')
+        count = queries.get(fingerprint__contains='COUNT(')
+        self.assertEqual(count.calls, 2)
+        self.assertGreaterEqual(count.max_time, 0)
+        self.assertNotEqual(count.plan, '')
+        distinct = queries.filter(fingerprint__contains='DISTINCT')
+        self.assertTrue(distinct.exists())
+
+    def test_parameter_values_not_stored(self):
+        """Test only the types and lengths of parameters are recorded."""
+        get_user_model().objects.filter(email='secret@example.com').exists()
+
+        query = SlowQuery.objects.get(
+            fingerprint__startswith='SELECT',
+            fingerprint__contains='"email" = ?',
+        )
+        self.assertEqual(query.params, 'str[18]')
+        self.assertNotIn('secret', query.plan)
+
+    def test_admin_lists_slow_queries(self):
+        """Test slow queries are listed in the admin, costliest first."""
+        self.client.get(RECIPES_URL)
+        self.client.force_login(self.user)
+
+        res = self.client.get(reverse('admin:core_slowquery_changelist'))
+
+        self.assertContains(res, 'recipe:recipe-list')
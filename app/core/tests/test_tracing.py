@@ -0,0 +1,97 @@
+"""
+Tests for sampled request tracing.
+"""
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import tracing
+from core.models import DeviceToken, Recipe
+from recipe.serializers import RecipeSerializer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TRACES_URL = reverse('admin-traces')
+
+
+def trace_detail_url(trace_id):
+    return reverse('admin-trace-detail', args=[trace_id])
+
+
+class TracingTests(TestCase):
+    """Test tracing requests and browsing traces."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            TRACE_DIR=directory.name, TRACE_SAMPLE_RATE=1
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='testpass123',
+        )
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price='2.00',
+        )
+        self.client = APIClient()
+        token = DeviceToken.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_request_phases_traced(self):
+        """Test a sampled request records nested spans for each phase."""
+        res = self.client.get(RECIPES_URL)
+
+        trace = tracing.find_trace(res['X-Trace-Id'])
+        self.assertEqual(trace['view'], 'recipe:recipe-list')
+        self.assertEqual(trace['status'], 200)
+        names = [span['name'] for span in trace['spans']]
+        self.assertEqual(names[0], 'request')
+        for name in (
+            'authenticate', 'get_queryset', 'serialize', 'render', 'sql',
+        ):
+            self.assertIn(name, names)
+        serialize = names.index('serialize')
+        children = [
+            span for span in trace['spans'] if span['parent'] == serialize
+        ]
+        self.assertTrue(all(span['name'] == 'sql' for span in children))
+
+    def test_list_serialized_in_one_span(self):
+        """Test serializing a list of recipes records a single span."""
+        for index in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {index}', time_minutes=5,
+                price='2.00',
+            )
+        trace = tracing.Trace()
+        token = tracing._trace.set(trace)
+        self.addCleanup(tracing._trace.reset, token)
+
+        RecipeSerializer(Recipe.objects.all(), many=True).data
+
+        names = [span['name'] for span in trace.spans]
+        self.assertEqual(names.count('serialize'), 1)
+
+    @override_settings(TRACE_SAMPLE_RATE=0)
+    def test_unsampled_request_not_traced(self):
+        """Test requests outside the sample are not traced."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('X-Trace-Id', res)
+        self.assertEqual(list(tracing.read_traces()), [])
+
+    def test_admin_lists_slowest_traces(self):
+        """Test staff can browse the slowest traces and their spans."""
+        trace_id = self.client.get(RECIPES_URL)['X-Trace-Id']
+        self.client.force_login(self.user)
+
+        res = self.client.get(TRACES_URL)
+        detail = self.client.get(trace_detail_url(trace_id))
+
+        self.assertContains(res, trace_detail_url(trace_id))
+        self.assertContains(detail, 'get_queryset')
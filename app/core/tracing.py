@@ -0,0 +1,197 @@
+"""
+Sampled in-process request tracing into rotating JSON lines files.
+
+A sampled request gets a trace of nested, timed spans: the request itself,
+SQL queries and the code wrapped with ``span()`` or ``@traced()``. Each
+process appends finished traces to ``TRACE_DIR/traces-<pid>.jsonl``,
+rotated at ``TRACE_MAX_BYTES``. Unsampled requests only pay for a context
+variable lookup per span.
+"""
+import contextvars
+import functools
+import glob
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+
+from core.middleware import request_hook
+
+# Trace of the request being handled, if sampled, and the ID of its open span.
+_trace = contextvars.ContextVar('trace', default=None)
+_span = contextvars.ContextVar('trace_span', default=None)
+
+_writer_lock = threading.Lock()
+_writers = {}
+
+
+class Trace:
+    """Spans of one request, in the order they started."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.spans = []
+        self.dropped = 0
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the block as a child of the current span, if tracing."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    if len(trace.spans) >= settings.TRACE_MAX_SPANS:
+        trace.dropped += 1
+        yield
+        return
+    start = time.perf_counter()
+    record = {
+        'id': len(trace.spans),
+        'parent': _span.get(),
+        'name': name,
+        'start_ms': round((start - trace.start) * 1000, 3),
+        'duration_ms': None,
+        'attrs': attrs,
+    }
+    trace.spans.append(record)
+    token = _span.set(record['id'])
+    try:
+        yield
+    finally:
+        record['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        _span.reset(token)
+
+
+def traced(name):
+    """Decorate a function to run in a span named name when tracing."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name, function=func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_query(execute, sql, params, many, context):
+    """Execute wrapper running each query in a span."""
+    if _trace.get() is None:
+        return execute(sql, params, many, context)
+    with span('sql', sql=sql[:1000], db=context['connection'].alias):
+        return execute(sql, params, many, context)
+
+
+def install(connection):
+    """Add ``trace_query`` to the execute wrappers of connection."""
+    if trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(trace_query)
+
+
+def _writer():
+    key = (os.getpid(), settings.TRACE_DIR)
+    with _writer_lock:
+        handler = _writers.get(key)
+        if handler is None:
+            os.makedirs(settings.TRACE_DIR, exist_ok=True)
+            handler = _writers[key] = RotatingFileHandler(
+                os.path.join(
+                    settings.TRACE_DIR, f'traces-{os.getpid()}.jsonl'
+                ),
+                maxBytes=settings.TRACE_MAX_BYTES,
+                backupCount=settings.TRACE_BACKUP_COUNT,
+                encoding='utf-8',
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+
+def _write(trace, request, response):
+    match = request.resolver_match
+    line = json.dumps({
+        'id': trace.id,
+        'started_at': trace.started_at.isoformat(),
+        'duration_ms': trace.spans[0]['duration_ms'],
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'dropped_spans': trace.dropped,
+        'spans': trace.spans,
+    }, default=str)
+    _writer().handle(logging.makeLogRecord({'msg': line}))
+
+
+def _sampled():
+    return random.random() < settings.TRACE_SAMPLE_RATE
+
+
+@request_hook
+def tracing_middleware(request):
+    """Trace ``TRACE_SAMPLE_RATE`` of requests, adding ``X-Trace-Id``."""
+    if not _sampled():
+        yield
+        return
+    trace = Trace()
+    token = _trace.set(trace)
+    try:
+        with span('request'):
+            response = yield
+    finally:
+        _trace.reset(token)
+    _write(trace, request, response)
+    response['X-Trace-Id'] = trace.id
+
+
+def read_traces():
+    """Yield the traces written by every process to ``TRACE_DIR``."""
+    for path in glob.glob(os.path.join(settings.TRACE_DIR, 'traces-*.jsonl*')):
+        try:
+            file = open(path, encoding='utf-8')
+        except OSError:
+            continue
+        with file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A line still being written by another process.
+                    continue
+
+
+def slowest_traces(limit):
+    return heapq.nlargest(
+        limit, read_traces(), key=lambda trace: trace['duration_ms']
+    )
+
+
+def find_trace(trace_id):
+    return next(
+        (trace for trace in read_traces() if trace['id'] == trace_id), None
+    )
+
+
+def span_tree(trace):
+    """Return (depth, span) pairs of trace in depth-first order."""
+    depths = {}
+    tree = []
+    for record in trace['spans']:
+        parent = record['parent']
+        depth = 0 if parent is None else depths[parent] + 1
+        depths[record['id']] = depth
+        tree.append((depth, record))
+    return tree
@@ -0,0 +1,139 @@
+"""
+Views for the core APIs.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+from core.serializers import BatchSerializer
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class BatchView(APIView):
+    """Run several API requests in one round trip.
+
+    Sub-requests are resolved and dispatched in-process, skipping the
+    middleware stack, and reuse the batch request's authentication. Only
+    sync DRF views can be batched; errors are reported per sub-request.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(request=BatchSerializer)
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['requests']
+
+        parallel = serializer.validated_data['parallel'] and all(
+            item['method'] in SAFE_METHODS for item in items
+        )
+        if parallel:
+            workers = min(settings.BATCH_MAX_WORKERS, len(items))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self._dispatch_in_thread, request, item,
+                    )
+                    for item in items
+                ]
+                responses = [future.result() for future in futures]
+        else:
+            responses = [self._dispatch(request, item) for item in items]
+
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
+
+    def _dispatch_in_thread(self, request, item):
+        try:
+            return self._dispatch(request, item)
+        finally:
+            connections.close_all()
+
+    def _build_request(self, request, item):
+        """Build a WSGI request for a sub-request sharing the caller's auth."""
+        path, _, query_string = item['path'].partition('?')
+        body = b''
+        if 'body' in item:
+            body = json.dumps(item['body']).encode()
+        environ = {
+            key: value for key, value in request.META.items()
+            if not key.startswith('wsgi.')
+        }
+        environ.update({
+            'REQUEST_METHOD': item['method'],
+            'PATH_INFO': path,
+            'QUERY_STRING': query_string,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.url_scheme': request.scheme,
+        })
+        sub_request = WSGIRequest(environ)
+        if request.user.is_authenticated:
+            sub_request._force_auth_user = request.user
+            sub_request._force_auth_token = request.auth
+        return sub_request
+
+    def _dispatch(self, request, item):
+        """Run one sub-request and return its status and body."""
+        try:
+            return self._run(request, item)
+        except Exception:
+            logger.exception(
+                'Batched %s %s failed', item['method'], item['path']
+            )
+            return {
+                'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                'body': {'detail': 'Server error.'},
+            }
+
+    def _run(self, request, item):
+        sub_request = self._build_request(request, item)
+        try:
+            match = resolve(sub_request.path_info)
+        except Resolver404:
+            return {
+                'status': status.HTTP_404_NOT_FOUND,
+                'body': {'detail': 'Not found.'},
+            }
+
+        view_class = getattr(match.func, 'cls', None)
+        if (not isinstance(view_class, type)
+                or not issubclass(view_class, APIView)
+                or asyncio.iscoroutinefunction(match.func)):
+            return {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'body': {'detail': 'Only API endpoints can be batched.'},
+            }
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        result = {'status': response.status_code, 'body': response.data}
+        if response.has_header('Location'):
+            result['headers'] = {'Location': response['Location']}
+        return result
+
+
+def metrics_view(request):
+    """Expose request metrics of every process in Prometheus text format."""
+    if not metrics.scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,97 @@
+"""
+Django command to archive and delete old messages in small batches.
+"""
+import gzip
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from messaging.models import Message
+
+ARCHIVE_FIELDS = ('id', 'conversation_id', 'sender_id', 'content', 'timestamp')
+
+
+class Command(BaseCommand):
+    """Archive messages older than a retention age to gzipped NDJSON."""
+    help = 'Archive and delete messages older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.MESSAGE_RETENTION_DAYS,
+            help='Archive messages older than this many days.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Width of each primary key range deleted per transaction.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=0.1,
+            help='Seconds to pause between batches.',
+        )
+        parser.add_argument(
+            '--archive-dir', default=settings.MESSAGE_ARCHIVE_DIR,
+            help='Directory to write the archive file to.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be archived without writing or deleting.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = timezone.now() - timezone.timedelta(days=options['days'])
+        old_messages = Message.objects.filter(timestamp__lt=cutoff)
+        bounds = old_messages.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            self.stdout.write('No messages to archive.')
+            return
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would archive messages with id {bounds["low"]}-'
+                f'{bounds["high"]} older than {cutoff.isoformat()}.'
+            )
+            return
+
+        os.makedirs(options['archive_dir'], exist_ok=True)
+        path = os.path.join(
+            options['archive_dir'],
+            f'messages-{timezone.now():%Y%m%dT%H%M%S}.ndjson.gz',
+        )
+        archived = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as archive:
+            start = bounds['low']
+            while start <= bounds['high']:
+                end = start + options['batch_size']
+                count = self._archive_batch(old_messages, start, end, archive)
+                archived += count
+                start = end
+                if count and options['sleep']:
+                    time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} messages to {path}.'
+        ))
+
+    def _archive_batch(self, queryset, start, end, archive):
+        """Write and delete one primary key range, returning its size."""
+        with transaction.atomic():
+            batch = queryset.filter(id__gte=start, id__lt=end)
+            rows = list(batch.select_for_update().values(*ARCHIVE_FIELDS))
+            if not rows:
+                return 0
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            # Make the rows durable before their delete commits. A sync flush
+            # keeps the archive readable up to here if the run dies later.
+            archive.flush()
+            os.fsync(archive.fileno())
+            Message.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        return len(rows)
@@ -0,0 +1,61 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+from messaging.models import SEARCH_CONFIG
+
+
+def create_search_index(apps, schema_editor):
+    """Create the GIN index, trigger and backfill on PostgreSQL only."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX message_search_vector_gin '
+        'ON messaging_message USING gin (search_vector);'
+    )
+    schema_editor.execute(
+        'CREATE TRIGGER message_search_vector_update '
+        'BEFORE INSERT OR UPDATE OF content ON messaging_message '
+        'FOR EACH ROW EXECUTE PROCEDURE '
+        f"tsvector_update_trigger(search_vector, '{SEARCH_CONFIG}', content);"
+    )
+    schema_editor.execute(
+        'UPDATE messaging_message '
+        f"SET search_vector = to_tsvector('{SEARCH_CONFIG}', content);"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP TRIGGER IF EXISTS message_search_vector_update '
+        'ON messaging_message;'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS message_search_vector_gin;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='message',
+                    index=GinIndex(fields=['search_vector'], name='message_search_vector_gin'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
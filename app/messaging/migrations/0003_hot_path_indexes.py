@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+INDEX = models.Index(fields=['conversation', 'timestamp'], name='message_conversation_ts_idx')
+
+
+def add_index(apps, schema_editor):
+    """Build the index without blocking writes on PostgreSQL."""
+    options = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    schema_editor.add_index(apps.get_model('messaging', 'Message'), INDEX, **options)
+
+
+def remove_index(apps, schema_editor):
+    options = {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+    schema_editor.remove_index(apps.get_model('messaging', 'Message'), INDEX, **options)
+
+
+class Migration(migrations.Migration):
+    """Indexes for the hot query paths flagged by ``audit_indexes``.
+
+    A user's conversations are looked up through the foreign key index
+    Django creates on ``user_id`` of the participants table.
+    """
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('messaging', '0002_message_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='message', index=INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_index, remove_index),
+            ],
+        ),
+    ]
@@ -1,8 +1,15 @@
 # backend/app/messaging/models.py
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
 
+from core.sharding import ShardedQuerySet
+
+# Text search configuration of Message.search_vector and of queries on it.
+SEARCH_CONFIG = 'pg_catalog.english'
+
 
 class Conversation(models.Model):
     participants = models.ManyToManyField(settings.AUTH_USER_MODEL)
@@ -17,6 +24,21 @@ class Message(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Maintained by a database trigger on PostgreSQL (see migration 0002).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=['search_vector'], name='message_search_vector_gin',
+            ),
+            models.Index(
+                fields=['conversation', 'timestamp'],
+                name='message_conversation_ts_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Message {self.id} from {self.sender}"
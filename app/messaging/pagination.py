@@ -0,0 +1,9 @@
+# backend/app/messaging/pagination.py
+
+from rest_framework.pagination import CursorPagination
+
+
+class MessageSearchPagination(CursorPagination):
+    """Keyset pagination for message search, newest first."""
+    page_size = 20
+    ordering = '-id'
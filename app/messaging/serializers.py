@@ -1,5 +1,6 @@
 # backend/app/messaging/serializers.py
 
+from django.utils.html import escape
 from rest_framework import serializers
 from .models import Conversation, Message
 
@@ -16,3 +17,26 @@ class MessageSerializer(serializers.ModelSerializer):
         model = Message
         fields = ['id', 'conversation', 'sender', 'content', 'timestamp']
         read_only_fields = ['id', 'timestamp']
+
+
+# Match delimiters from ``SearchHeadline``, replaced by <mark> tags once the
+# fragment has been HTML-escaped.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+class MessageSearchSerializer(MessageSerializer):
+    """Serializer for message search results with the matched fragment.
+
+    The headline is HTML: message content is escaped and only the matches
+    are wrapped in ``<mark>`` tags.
+    """
+    headline = serializers.SerializerMethodField()
+
+    class Meta(MessageSerializer.Meta):
+        fields = MessageSerializer.Meta.fields + ['headline']
+
+    def get_headline(self, obj):
+        return escape(obj.headline).replace(
+            HIGHLIGHT_START, '<mark>',
+        ).replace(HIGHLIGHT_STOP, '</mark>')
@@ -1,3 +1,188 @@
+"""
+Tests for messaging APIs.
+"""
+import gzip
+from io import StringIO
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from messaging.models import Conversation, Message
+
+SEARCH_URL = reverse('message-search')
+
+
+def create_user(**params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(**params)
+
+
+def create_conversation(*participants):
+    """Create and return a conversation between participants."""
+    conversation = Conversation.objects.create()
+    conversation.participants.add(*participants)
+    return conversation
+
+
+class MessageSearchApiTests(TestCase):
+    """Test message search API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.other = create_user(email='other@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_search_auth_required(self):
+        """Test authentication is required for searching messages."""
+        res = APIClient().get(SEARCH_URL, {'q': 'pasta'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_search_limited_to_participant_conversations(self):
+        """Test only messages from the user's conversations are returned."""
+        mine = create_conversation(self.user, self.other)
+        theirs = create_conversation(self.other)
+        match = Message.objects.create(
+            conversation=mine, sender=self.other,
+            content='Fresh pasta tonight',
+        )
+        Message.objects.create(
+            conversation=mine, sender=self.user, content='Sounds good',
+        )
+        Message.objects.create(
+            conversation=theirs, sender=self.other,
+            content='Secret pasta recipe',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'pasta'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([m['id'] for m in res.data['results']], [match.id])
+        self.assertIn('pasta', res.data['results'][0]['headline'])
+
+    def test_search_headline_escaped(self):
+        """Test message content in the headline is HTML-escaped."""
+        conversation = create_conversation(self.user)
+        Message.objects.create(
+            conversation=conversation, sender=self.user,
+            content='pasta <script>alert(1)</script> for 2 < 3 & "friends"',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'pasta'})
+
+        # PostgreSQL's ts_headline drops tags itself but keeps other markup.
+        headline = res.data['results'][0]['headline']
+        self.assertNotIn('<script>', headline)
+        self.assertIn('2 &lt; 3 &amp; &quot;friends&quot;', headline)
+
+    def test_search_cursor_paginated(self):
+        """Test search results are cursor paginated, newest first."""
+        conversation = create_conversation(self.user)
+        messages = [
+            Message.objects.create(
+                conversation=conversation, sender=self.user,
+                content=f'soup {i}',
+            )
+            for i in range(25)
+        ]
+
+        res = self.client.get(SEARCH_URL, {'q': 'soup'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 20)
+        self.assertEqual(res.data['results'][0]['id'], messages[-1].id)
+        self.assertIn('cursor=', res.data['next'])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_search_empty_query(self):
+        """Test an empty query returns no results."""
+        conversation = create_conversation(self.user)
+        Message.objects.create(
+            conversation=conversation, sender=self.user, content='Hello',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': ''})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+
+class ArchiveMessagesCommandTests(TestCase):
+    """Test the archive_messages management command."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.conversation = create_conversation(self.user)
+
+    def create_message(self, content, age_days):
+        message = Message.objects.create(
+            conversation=self.conversation, sender=self.user, content=content,
+        )
+        Message.objects.filter(id=message.id).update(
+            timestamp=timezone.now() - timedelta(days=age_days),
+        )
+        return message
+
+    def test_archive_old_messages(self):
+        """Test old messages are written to the archive and deleted."""
+        old = [self.create_message(f'old {i}', 400) for i in range(5)]
+        recent = self.create_message('recent', 1)
+
+        with tempfile.TemporaryDirectory() as archive_dir:
+            call_command(
+                'archive_messages', days=365, batch_size=2, sleep=0,
+                archive_dir=archive_dir, stdout=StringIO(),
+            )
+            [name] = os.listdir(archive_dir)
+            with gzip.open(os.path.join(archive_dir, name), 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertEqual([row['id'] for row in rows], [m.id for m in old])
+        self.assertEqual(rows[0]['content'], 'old 0')
+        self.assertEqual(
+            list(Message.objects.values_list('id', flat=True)), [recent.id],
+        )
+
+    def test_archive_skips_sleep_for_empty_ranges(self):
+        """Test the pause between batches is skipped for empty ID ranges."""
+        first = self.create_message('old', 400)
+        self.create_message('recent', 1)
+        last = self.create_message('old', 400)
+        Message.objects.filter(id=first.id).update(id=last.id - 10)
+
+        with tempfile.TemporaryDirectory() as archive_dir, \
+                mock.patch('time.sleep') as sleep:
+            call_command(
+                'archive_messages', days=365, batch_size=1, sleep=1,
+                archive_dir=archive_dir, stdout=StringIO(),
+            )
+
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_dry_run_keeps_messages(self):
+        """Test a dry run neither writes an archive nor deletes messages."""
+        self.create_message('old', 400)
+
+        with tempfile.TemporaryDirectory() as archive_dir:
+            call_command(
+                'archive_messages', days=365, dry_run=True,
+                archive_dir=archive_dir, stdout=StringIO(),
+            )
+            self.assertEqual(os.listdir(archive_dir), [])
 
-# Create your tests here.
+        self.assertEqual(Message.objects.count(), 1)
@@ -1,9 +1,26 @@
 # backend/app/messaging/views.py
 
+from django.contrib.postgres.search import SearchHeadline, SearchQuery
+from django.db import connections
+from django.db.models import F
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
 from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from .models import Conversation, Message
-from .serializers import ConversationSerializer, MessageSerializer
+from core.sharding import ShardedViewMixin, sharding_enabled
+from .models import Conversation, Message, SEARCH_CONFIG
+from .pagination import MessageSearchPagination
+from .serializers import (
+    ConversationSerializer,
+    MessageSerializer,
+    MessageSearchSerializer,
+    HIGHLIGHT_START,
+    HIGHLIGHT_STOP,
+)
 
 
 class ConversationViewSet(viewsets.ModelViewSet):
@@ -19,7 +36,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
         conversation.participants.add(self.request.user)
 
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(ShardedViewMixin, viewsets.ModelViewSet):
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
@@ -27,5 +44,67 @@ class MessageViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return self.queryset.filter(conversation__participants=self.request.user)
 
+    def get_serializer_class(self):
+        if self.action == 'search':
+            return MessageSearchSerializer
+        return self.serializer_class
+
+    def list(self, request, *args, **kwargs):
+        if sharding_enabled():
+            return self.sharded_list(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(sender=self.request.user)
+
+    def _participant_conversation_ids(self):
+        """Subquery of conversation IDs the user takes part in.
+
+        Filtering on ``conversation_id IN (...)`` lets the planner resolve the
+        user's conversations once instead of joining participants per row.
+        """
+        through = Conversation.participants.through
+        return through.objects.filter(
+            user=self.request.user,
+        ).values('conversation_id')
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Search terms to match in message content.',
+                required=True,
+            ),
+        ]
+    )
+    @action(methods=['GET'], detail=False)
+    def search(self, request):
+        """Full-text search within the user's conversations."""
+        terms = request.query_params.get('q', '').strip()
+        queryset = Message.objects.filter(
+            conversation_id__in=self._participant_conversation_ids(),
+        )
+        if not terms:
+            queryset = queryset.none()
+        elif connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(
+                terms, config=SEARCH_CONFIG, search_type='websearch',
+            )
+            queryset = queryset.filter(search_vector=query).annotate(
+                headline=SearchHeadline(
+                    'content', query, config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                ),
+            )
+        else:
+            queryset = queryset.filter(content__icontains=terms).annotate(
+                headline=F('content'),
+            )
+
+        if sharding_enabled():
+            return self.sharded_list(queryset)
+        paginator = MessageSearchPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,126 @@
+"""
+Django command to benchmark recipe list serialization throughput.
+"""
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.fast_serializers import RecipeListReader
+from recipe.serializers import RecipeSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard seeded benchmark data."""
+
+
+def seed_recipes(rows):
+    """Create throwaway recipes with tags and ingredients for benchmarks."""
+    user = get_user_model().objects.create_user(
+        email='benchmark@example.com', password='benchmark',
+    )
+    tags = [
+        Tag.objects.create(user=user, name=f'bench-tag-{i}') for i in range(5)
+    ]
+    ingredients = [
+        Ingredient.objects.create(user=user, name=f'bench-ingredient-{i}')
+        for i in range(5)
+    ]
+    Recipe.objects.bulk_create(
+        Recipe(
+            user=user, title=f'Benchmark recipe {i}', time_minutes=10,
+            price=Decimal('4.50'), description='Benchmark',
+        )
+        for i in range(rows)
+    )
+    recipes = Recipe.objects.filter(user=user).only('id')
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes for tag in tags[:3]
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.id, ingredient_id=ingredient.id
+        )
+        for recipe in recipes for ingredient in ingredients[:4]
+    )
+
+
+def best_time(func, repeat):
+    """Return the fastest wall time of repeat calls to func, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    """Compare RecipeSerializer with the compiled list reader's rows/s."""
+    help = 'Benchmark recipe list serialization in rows per second.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Number of recipes serialized per run.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs; the best run is reported.',
+        )
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Create --rows throwaway recipes and roll them back after.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    seed_recipes(options['rows'])
+                self._run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, rows, repeat):
+        request = Request(APIRequestFactory().get('/api/recipe/recipes/'))
+        request.user = get_user_model().objects.first() or AnonymousUser()
+        queryset = Recipe.objects.order_by('-id')[:rows]
+        count = queryset.count()
+        if not count:
+            self.stdout.write('No recipes to serialize; use --seed.')
+            return
+
+        def drf():
+            recipes = queryset.select_related('user').prefetch_related(
+                'tags', 'ingredients', 'likes'
+            )
+            RecipeSerializer(
+                recipes, many=True, context={'request': request}
+            ).data
+
+        def compiled():
+            reader = RecipeListReader(RecipeSerializer.Meta.fields, request)
+            reader.render(reader.rows(queryset))
+
+        drf_time = best_time(drf, repeat)
+        compiled_time = best_time(compiled, repeat)
+        self.stdout.write(
+            f'RecipeSerializer:  {count / drf_time:12.0f} rows/s'
+        )
+        self.stdout.write(
+            f'RecipeListReader:  {count / compiled_time:12.0f} rows/s'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Speedup: {drf_time / compiled_time:.1f}x over {count} rows'
+        ))
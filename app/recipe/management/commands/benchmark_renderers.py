@@ -0,0 +1,81 @@
+"""
+Django command to benchmark JSON rendering of recipe payloads.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, recipe_image_file_path
+from core.renderers import FastJSONRenderer, orjson
+from recipe.management.commands.benchmark_recipe_list import (
+    Rollback,
+    best_time,
+    seed_recipes,
+)
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Compare DRF's JSONRenderer with FastJSONRenderer on recipe payloads."""
+    help = 'Benchmark JSON rendering of the recipe list and detail payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Number of recipes in the list payload.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Number of timed renders; the best run is reported.',
+        )
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Create --rows throwaway recipes and roll them back after.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed; FastJSONRenderer uses the stdlib.'
+            ))
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    seed_recipes(options['rows'])
+                self._run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, rows, repeat):
+        recipes = list(
+            Recipe.objects.order_by('-id')
+            .select_related('user')
+            .prefetch_related('tags', 'ingredients', 'likes')[:rows]
+        )
+        if not recipes:
+            self.stdout.write('No recipes to render; use --seed.')
+            return
+        for recipe in recipes:
+            if not recipe.image:
+                recipe.image.name = recipe_image_file_path(recipe, 'image.jpg')
+
+        request = Request(APIRequestFactory().get('/api/recipe/recipes/'))
+        context = {'request': request}
+        payloads = {
+            'list': RecipeSerializer(recipes, many=True, context=context).data,
+            'detail': RecipeDetailSerializer(recipes[0], context=context).data,
+        }
+        for name, data in payloads.items():
+            size = len(JSONRenderer().render(data))
+            stdlib = best_time(lambda: JSONRenderer().render(data), repeat)
+            fast = best_time(lambda: FastJSONRenderer().render(data), repeat)
+            self.stdout.write(
+                f'{name:<7} {size:>10} bytes  '
+                f'JSONRenderer {stdlib * 1000:8.3f} ms  '
+                f'FastJSONRenderer {fast * 1000:8.3f} ms  '
+                f'({stdlib / fast:.1f}x)'
+            )
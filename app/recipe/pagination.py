@@ -1,6 +1,6 @@
 # backend/app/recipe/pagination.py
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -14,3 +14,12 @@ class CustomPagination(PageNumberPagination):
             'next': self.get_next_link(),
             'previous': self.get_previous_link()
         })
+
+
+class CommentCursorPagination(CursorPagination):
+    """Keyset pagination over a recipe's comments, newest first.
+
+    The ID breaks ties between comments created in the same instant.
+    """
+    page_size = 20
+    ordering = ('-created_at', '-id')
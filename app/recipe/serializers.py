@@ -1,9 +1,15 @@
 # recipe/serializers.py
+from operator import itemgetter
+
 from rest_framework import serializers
-from core.models import Recipe, Tag, Ingredient, Rating, Follow, Comment
+from core.fieldsets import SparseFieldsetMixin
+from core.tracing import traced
+from core.models import (
+    RATING_SCORES, Recipe, Tag, Ingredient, Rating, Follow, Comment,
+)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for ingredients."""
 
     class Meta:
@@ -12,7 +18,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -26,6 +32,7 @@ class RatingSerializer(serializers.ModelSerializer):
         model = Rating
         fields = ['id', 'user', 'recipe', 'score']
         read_only_fields = ['id', 'user', 'recipe']
+        extra_kwargs = {'score': {'min_value': 1, 'max_value': 5}}
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -38,11 +45,42 @@ class FollowSerializer(serializers.ModelSerializer):
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
-        fields = ['id', 'user', 'recipe', 'content', 'created_at']
-        read_only_fields = ['id', 'user', 'recipe', 'created_at']
+        fields = [
+            'id', 'user', 'recipe', 'parent', 'depth', 'content',
+            'reply_count', 'created_at'
+        ]
+        read_only_fields = [
+            'id', 'user', 'recipe', 'parent', 'depth', 'reply_count',
+            'created_at'
+        ]
+
+
+class CommentThreadSerializer(CommentSerializer):
+    """Serializer for a top-level comment with its first replies.
+
+    Replies are read from the ``replies`` context mapping built by
+    ``Comment.first_replies`` so a page of threads costs one query.
+    """
+    replies = serializers.SerializerMethodField()
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['replies']
+
+    def get_replies(self, obj):
+        replies = self.context.get('replies', {}).get(obj.id, [])
+        return CommentSerializer(replies, many=True).data
+
 
+class TracedListSerializer(serializers.ListSerializer):
+    """List serializer tracing a whole page as one ``serialize`` span."""
 
-class RecipeSerializer(serializers.ModelSerializer):
+    @property
+    @traced('serialize')
+    def data(self):
+        return super().data
+
+
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
@@ -59,10 +97,32 @@ class RecipeSerializer(serializers.ModelSerializer):
             'description', 'image', 'user'
         ]
         read_only_fields = ['id', 'likes', 'average_rating', 'ratings_count', 'is_liked']
+        list_serializer_class = TracedListSerializer
+
+    field_dependencies = {'is_liked': ['likes']}
+
+    @property
+    @traced('serialize')
+    def data(self):
+        return super().data
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # List relations in ID order, prefetched or not, like RecipeListReader.
+        for name in ('tags', 'ingredients'):
+            if name in data:
+                data[name].sort(key=itemgetter('id'))
+        if 'likes' in data:
+            data['likes'].sort()
+        return data
 
     def get_is_liked(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if 'likes' in getattr(obj, '_prefetched_objects_cache', {}):
+                return any(
+                    user.id == request.user.id for user in obj.likes.all()
+                )
             return obj.likes.filter(id=request.user.id).exists()
         return False
 
@@ -120,11 +180,53 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
-    ratings = RatingSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
+    my_rating = serializers.SerializerMethodField()
+    comments_count = serializers.IntegerField(
+        source='comments.count', read_only=True
+    )
+    comments = serializers.SerializerMethodField()
+
+    # Number of newest comments embedded in the detail view; the full list
+    # is served by the paginated comments endpoint.
+    comments_preview_size = 5
+
+    field_dependencies = {
+        **RecipeSerializer.field_dependencies,
+        'rating_histogram': [
+            f'rating_{score}_count' for score in RATING_SCORES
+        ],
+        'my_rating': [],
+        'comments_count': [],
+        'comments': [],
+    }
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['ratings', 'comments']
+        fields = RecipeSerializer.Meta.fields + [
+            'rating_histogram', 'my_rating', 'comments_count', 'comments'
+        ]
+
+    def get_rating_histogram(self, obj):
+        """Return the count of ratings for each score."""
+        return {
+            str(score): count for score, count in obj.rating_histogram.items()
+        }
+
+    def get_my_rating(self, obj):
+        """Return the requesting user's score for the recipe, if any."""
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return Rating.objects.filter(
+                recipe=obj, user=request.user
+            ).values_list('score', flat=True).first()
+        return None
+
+    def get_comments(self, obj):
+        """Return the newest top-level comments for the recipe."""
+        comments = obj.comments.filter(parent__isnull=True).order_by(
+            '-created_at'
+        )[:self.comments_preview_size]
+        return CommentSerializer(comments, many=True).data
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -2,6 +2,7 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+import io
 import tempfile
 import os
 
@@ -12,14 +13,20 @@ from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
+from core.parsers import MessagePackParser
+from core.renderers import MessagePackRenderer
+from core.tests.helpers import QueryBudgetMixin
 from core.models import (
     Recipe,
     Tag,
     Ingredient,
+    Comment,
 )
 
+from recipe.fast_serializers import RecipeListReader
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
@@ -38,6 +45,26 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def comments_url(recipe_id):
+    """Create and return a recipe comments URL."""
+    return reverse('recipe:recipe-comments', args=[recipe_id])
+
+
+def comment_thread_url(comment_id):
+    """Create and return a comment thread URL."""
+    return reverse('recipe:comment-thread', args=[comment_id])
+
+
+def add_comment_url(recipe_id):
+    """Create and return an add comment URL."""
+    return reverse('recipe:recipe-add-comment', args=[recipe_id])
+
+
+def rate_url(recipe_id):
+    """Create and return a recipe rate URL."""
+    return reverse('recipe:recipe-rate', args=[recipe_id])
+
+
 def create_recipe(user, **params):
     """Create and return a sample recipe."""
     defaults = {
@@ -129,6 +156,27 @@ class PrivateRecipeApiTests(TestCase):
             self.assertEqual(getattr(recipe, k), v)
         self.assertEqual(recipe.user, self.user)
 
+    def test_create_and_retrieve_recipe_msgpack(self):
+        """Test creating and retrieving a recipe using MessagePack."""
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+        }
+        res = self.client.post(
+            RECIPES_URL,
+            MessagePackRenderer().render(payload),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = MessagePackParser().parse(io.BytesIO(res.content))
+        recipe = Recipe.objects.get(id=data['id'])
+        self.assertEqual(recipe.price, payload['price'])
+        self.assertEqual(data['price'], '5.99')
+
     def test_partial_update(self):
         """Test partial update of a recipe."""
         original_link = 'https://example.com/recipe.pdf'
@@ -418,6 +466,266 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_list_recipes_sparse_fields(self):
+        """Test ?fields= trims the response and skips unused relations."""
+        for i in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [set(r) for r in res.data['results']], [{'id', 'title'}] * 3
+        )
+
+    def test_list_recipes_omit_fields(self):
+        """Test ?omit= drops the named fields and prefetches the rest."""
+        for i in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            tag = Tag.objects.create(user=self.user, name=f'Tag {i}')
+            recipe.tags.add(tag)
+
+        res = self.client.get(
+            RECIPES_URL, {'omit': 'ingredients,likes,is_liked'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        result = res.data['results'][0]
+        self.assertNotIn('ingredients', result)
+        self.assertNotIn('likes', result)
+        self.assertEqual(result['tags'], [{'id': tag.id, 'name': tag.name}])
+
+    def test_multi_get_recipes_by_ids(self):
+        """Test fetching recipes by ID keeps order and reports missing IDs."""
+        r1 = create_recipe(user=self.user, title='First')
+        r2 = create_recipe(user=self.user, title='Second')
+        r3 = create_recipe(user=self.user, title='Third')
+        missing_id = r3.id + 100
+
+        with self.assertNumQueries(4):
+            res = self.client.get(
+                RECIPES_URL, {'ids': f'{r3.id},{missing_id},{r1.id}'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['title'] for r in res.data['results']], ['Third', 'First']
+        )
+        self.assertEqual(res.data['missing'], [missing_id])
+        self.assertNotIn(r2.id, [r['id'] for r in res.data['results']])
+
+    def test_multi_get_recipes_limits(self):
+        """Test multi-get rejects invalid and oversized ID lists."""
+        res = self.client.get(RECIPES_URL, {'ids': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        too_many = ','.join(str(i) for i in range(1, 102))
+        res = self.client.get(RECIPES_URL, {'ids': too_many})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_reader_matches_serializer(self):
+        """Test the compiled list path renders what RecipeSerializer does."""
+        other_user = create_user(email='other@example.com', password='test123')
+        r1 = create_recipe(user=self.user, price=Decimal('7.5'))
+        r2 = create_recipe(user=other_user, title='Second')
+        r1.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        r1.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+        r1.likes.add(self.user, other_user)
+        r2.likes.add(other_user)
+        Recipe.objects.filter(id=r2.id).update(image='uploads/recipe/test.jpg')
+        request = Request(APIRequestFactory().get(RECIPES_URL))
+        request.user = self.user
+        recipes = Recipe.objects.order_by('-id')
+
+        serializer = RecipeSerializer(
+            recipes, many=True, context={'request': request}
+        )
+        reader = RecipeListReader(RecipeSerializer.Meta.fields, request)
+
+        self.assertTrue(reader.is_supported)
+        self.assertEqual(reader.render(reader.rows(recipes)), serializer.data)
+
+    def test_recipe_detail_limits_comments(self):
+        """Test recipe detail embeds a count and only the newest comments."""
+        recipe = create_recipe(user=self.user)
+        comments = [
+            Comment.objects.create(
+                user=self.user, recipe=recipe, content=f'Comment {i}'
+            )
+            for i in range(8)
+        ]
+
+        res = self.client.get(detail_url(recipe.id))
+
+        preview_size = RecipeDetailSerializer.comments_preview_size
+        self.assertEqual(res.data['comments_count'], 8)
+        self.assertEqual(
+            [c['id'] for c in res.data['comments']],
+            [c.id for c in reversed(comments)][:preview_size],
+        )
+
+    def test_list_recipe_comments_paginated(self):
+        """Test listing all comments of a recipe with cursor pagination."""
+        recipe = create_recipe(user=self.user)
+        other_recipe = create_recipe(user=self.user)
+        for i in range(25):
+            Comment.objects.create(
+                user=self.user, recipe=recipe, content=f'Comment {i}'
+            )
+        Comment.objects.create(
+            user=self.user, recipe=other_recipe, content='Other'
+        )
+
+        res = self.client.get(comments_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 20)
+        self.assertEqual(res.data['results'][0]['content'], 'Comment 24')
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertIsNone(res.data['next'])
+
+    def test_list_recipe_comments_same_timestamp(self):
+        """Test comments created in the same instant are paged exactly once."""
+        recipe = create_recipe(user=self.user)
+        comments = [
+            Comment.objects.create(
+                user=self.user, recipe=recipe, content=f'Comment {i}'
+            )
+            for i in range(25)
+        ]
+        Comment.objects.filter(recipe=recipe).update(
+            created_at=comments[0].created_at
+        )
+
+        res = self.client.get(comments_url(recipe.id))
+        ids = [c['id'] for c in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [c['id'] for c in res.data['results']]
+
+        self.assertEqual(ids, [c.id for c in reversed(comments)])
+
+    def test_rate_recipe_updates_histogram(self):
+        """Test rating and re-rating a recipe keeps the histogram current."""
+        recipe = create_recipe(user=self.user)
+        other_user = create_user(email='other@example.com', password='test123')
+        other_client = APIClient()
+        other_client.force_authenticate(other_user)
+
+        self.client.post(rate_url(recipe.id), {'score': 4})
+        other_client.post(rate_url(recipe.id), {'score': 2})
+        res = self.client.post(rate_url(recipe.id), {'score': 5})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(
+            res.data['rating_histogram'],
+            {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1},
+        )
+        self.assertEqual(res.data['my_rating'], 5)
+        self.assertEqual(res.data['ratings_count'], 2)
+        self.assertEqual(res.data['average_rating'], '3.50')
+        self.assertNotIn('ratings', res.data)
+
+    def test_rate_recipe_invalid_score(self):
+        """Test rating a recipe outside the 1-5 range fails."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.post(rate_url(recipe.id), {'score': 6})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ratings_count, 0)
+
+    def test_reply_to_comment(self):
+        """Test replying to a comment and fetching threads with replies."""
+        recipe = create_recipe(user=self.user)
+        root = Comment.objects.create(
+            user=self.user, recipe=recipe, content='Root'
+        )
+
+        for i in range(5):
+            res = self.client.post(
+                add_comment_url(recipe.id),
+                {'content': f'Reply {i}', 'parent': root.id},
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(comments_url(recipe.id))
+
+        [thread] = res.data['results']
+        self.assertEqual(thread['reply_count'], 5)
+        self.assertEqual(
+            [r['content'] for r in thread['replies']],
+            ['Reply 0', 'Reply 1', 'Reply 2'],
+        )
+
+        res = self.client.get(comment_thread_url(root.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 6)
+        self.assertEqual(res.data[0]['id'], root.id)
+
+    def test_reply_to_comment_on_other_recipe_fails(self):
+        """Test a reply must target a comment on the same recipe."""
+        recipe = create_recipe(user=self.user)
+        other_recipe = create_recipe(user=self.user)
+        comment = Comment.objects.create(
+            user=self.user, recipe=other_recipe, content='Hi'
+        )
+
+        res = self.client.post(
+            add_comment_url(recipe.id),
+            {'content': 'Reply', 'parent': comment.id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Comment.objects.filter(recipe=recipe).exists())
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test the recipe endpoints stay within their query budgets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        for index in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {index}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {index}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(
+                    user=self.user, name=f'Ingredient {index}'
+                )
+            )
+            recipe.likes.add(self.user)
+        self.recipe = recipe
+
+    def test_list_budget(self):
+        """Test listing recipes does not run queries per recipe."""
+        with self.assertQueryBudget(5):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertIn('db;dur=', res['Server-Timing'])
+
+    def test_detail_budget(self):
+        """Test retrieving a recipe stays within its budget."""
+        with self.assertQueryBudget(7):
+            res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(res.data['is_liked'])
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload Api."""
@@ -19,11 +19,18 @@ from rest_framework import generics, permissions
 from .serializers import (
     RecipeSerializer, TagSerializer, IngredientSerializer,
     RatingSerializer, FollowSerializer, CommentSerializer, RecipeDetailSerializer,
-    RecipeImageSerializer
+    RecipeImageSerializer, CommentThreadSerializer
 )
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from .fast_serializers import RecipeListReader
+from .pagination import CommentCursorPagination
+from core.authentication import CachedTokenAuthentication
+from core.fieldsets import SparseFieldsetViewMixin
+from core.sharding import (
+    ShardedViewMixin, scatter, sharding_enabled, use_shard,
+)
+from core.tracing import traced
 from core.models import (
     Recipe,
     Tag,
@@ -47,15 +54,38 @@ from core.models import (
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                description=(
+                    'Comma separated list of recipe IDs to fetch, in order'
+                ),
+            ),
+            OpenApiParameter(
+                'fields',
+                OpenApiTypes.STR,
+                description='Comma separated list of fields to return',
+            ),
+            OpenApiParameter(
+                'omit',
+                OpenApiTypes.STR,
+                description='Comma separated list of fields to leave out',
+            ),
         ]
     )
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    ShardedViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet
+):
     """View for managing recipe APIs."""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # Number of replies returned with each thread on the comments endpoint.
+    thread_replies_size = 3
+    # Largest number of recipes one ?ids= request may fetch.
+    multi_get_max_size = 100
 
     def perform_create(self, serializer):
         """Create a new recipe."""
@@ -66,11 +96,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Convert a list of strings to integers."""
         return [int(str_id) for str_id in qs.split(',')]
 
+    @traced('get_queryset')
     def get_queryset(self):
         """Retrieve all recipes."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        queryset = super().get_queryset()
         if tags:
             tag_ids = self._params_to_ints(tags)
             queryset = queryset.filter(tags__id__in=tag_ids)
@@ -80,12 +111,76 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return queryset.order_by('-id').distinct()
 
+    def list(self, request, *args, **kwargs):
+        """List recipes through the compiled read-only serializer."""
+        ids = request.query_params.get('ids')
+        if ids is not None:
+            return self._multi_get(ids)
+
+        reader = RecipeListReader(self.get_serializer().fields, request)
+        if sharding_enabled():
+            queryset = self.filter_queryset(self.get_queryset())
+            if reader.is_supported:
+                return self.sharded_list(reader.rows(queryset), reader.render)
+            return self.sharded_list(queryset)
+        if not reader.is_supported:
+            return super().list(request, *args, **kwargs)
+
+        queryset = reader.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.render(page))
+        return Response(reader.render(queryset))
+
+    def _multi_get(self, ids):
+        """Return the requested recipes in request order with one query."""
+        try:
+            ids = list(dict.fromkeys(self._params_to_ints(ids)))
+        except ValueError:
+            return Response(
+                {'ids': ['Enter a comma separated list of recipe IDs.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > self.multi_get_max_size:
+            return Response(
+                {'ids': [
+                    f'Request at most {self.multi_get_max_size} recipes'
+                    ' at once.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.filter_queryset(self.get_queryset()).filter(id__in=ids)
+        reader = RecipeListReader(self.get_serializer().fields, self.request)
+        found = {}
+        for alias, shard_queryset in scatter(queryset):
+            with use_shard(alias):
+                if reader.is_supported:
+                    rows = list(reader.rows(shard_queryset))
+                    ids_found = (row['id'] for row in rows)
+                    found.update(zip(ids_found, reader.render(rows)))
+                else:
+                    recipes = list(shard_queryset)
+                    data = self.get_serializer(recipes, many=True).data
+                    found.update(zip((recipe.id for recipe in recipes), data))
+
+        return Response({
+            'results': [
+                found[recipe_id] for recipe_id in ids if recipe_id in found
+            ],
+            'missing': [
+                recipe_id for recipe_id in ids if recipe_id not in found
+            ],
+        })
+
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
             return RecipeSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'comments':
+            return CommentThreadSerializer
 
         return self.serializer_class
 
@@ -119,12 +214,16 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def rate(self, request, pk=None):
         """Rate a recipe."""
         recipe = self.get_object()
-        rating_value = request.data.get('score')
+        serializer = RatingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
         rating, created = Rating.objects.update_or_create(
             user=request.user, recipe=recipe,
-            defaults={'score': rating_value}
+            defaults={'score': serializer.validated_data['score']}
         )
-        recipe.update_rating()
         serializer = RatingSerializer(rating)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -133,14 +232,43 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Add a comment to a recipe."""
         recipe = self.get_object()
         comment_content = request.data.get('content')
+        parent = None
+        parent_id = request.data.get('parent')
+        if parent_id:
+            parent = Comment.objects.filter(
+                pk=parent_id, recipe=recipe
+            ).first()
+            if parent is None or parent.depth >= Comment.MAX_DEPTH:
+                return Response(
+                    {'parent': ['Invalid parent comment.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         comment = Comment.objects.create(
             user=request.user,
             recipe=recipe,
+            parent=parent,
             content=comment_content
         )
         serializer = CommentSerializer(comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(
+        methods=['GET'], detail=True,
+        pagination_class=CommentCursorPagination,
+    )
+    def comments(self, request, pk=None):
+        """List a recipe's comment threads, newest first."""
+        recipe = self.get_object()
+        page = self.paginate_queryset(
+            Comment.objects.filter(recipe=recipe, parent__isnull=True)
+        )
+        context = self.get_serializer_context()
+        context['replies'] = Comment.first_replies(
+            page, self.thread_replies_size
+        )
+        serializer = CommentThreadSerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -153,12 +281,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ]
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(SparseFieldsetViewMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
@@ -166,7 +295,7 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        queryset = super().get_queryset()
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
 
@@ -189,7 +318,7 @@ class FollowViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
     """Manage following and unfollowing users."""
     serializer_class = FollowSerializer
     queryset = Follow.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
@@ -213,17 +342,28 @@ class FollowViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
         return Response(status=status.HTTP_200_OK)
 
 
-class CommentViewSet(viewsets.GenericViewSet, mixins.DestroyModelMixin):
+class CommentViewSet(
+    ShardedViewMixin, viewsets.GenericViewSet, mixins.DestroyModelMixin
+):
     """Manage comments in the database."""
     serializer_class = CommentSerializer
     queryset = Comment.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
         """Retrieve the comments for the authenticated user."""
+        if self.action == 'thread':
+            return self.queryset
         return self.queryset.filter(user=self.request.user)
 
+    @action(methods=['GET'], detail=True)
+    def thread(self, request, pk=None):
+        """Retrieve a comment and all of its replies in thread order."""
+        comment = self.get_object()
+        serializer = self.get_serializer(comment.thread(), many=True)
+        return Response(serializer.data)
+
     @action(methods=['DELETE'], detail=True, url_path='delete-comment')
     def delete_comment(self, request, pk=None):
         """Delete a comment."""
@@ -0,0 +1,121 @@
+"""
+Async login and signup views for ASGI deployments.
+
+Password digests are awaited on the bounded pool in ``core.hashing``, so
+neither the event loop nor the shared sync thread is held while PBKDF2 runs;
+lookups and writes happen in short sync hops around it. A saturated pool
+fails fast with 503.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, MethodNotAllowed, NotAcceptable,
+)
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core import hashing
+from core.models import DeviceToken
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+from user.serializers import CredentialsSerializer, UserSerializer
+
+RENDERERS = (FastJSONRenderer(), MessagePackRenderer())
+
+
+def _respond(request, data, status_code):
+    """Render data for the client's Accept header, as a DRF view would."""
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(
+            request, RENDERERS
+        )
+    except NotAcceptable:
+        renderer, media_type = RENDERERS[0], RENDERERS[0].media_type
+    response = HttpResponse(
+        renderer.render(data, media_type, {}),
+        status=status_code, content_type=media_type,
+    )
+    return hashing.report_hashing_time(request, response)
+
+
+def async_post_view(func):
+    """Turn ``async func(request) -> (data, status)`` into a POST-only view."""
+    @functools.wraps(func)
+    async def view(request):
+        hashing.hashing_time.set(0.0)
+        parsers = [parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]
+        request = Request(request, parsers=parsers)
+        try:
+            if request.method != 'POST':
+                raise MethodNotAllowed(request.method)
+            data, status_code = await func(request)
+        except APIException as exc:
+            data, status_code = {'detail': exc.detail}, exc.status_code
+        except hashing.HashingUnavailable as exc:
+            data = {'detail': str(exc)}
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return _respond(request, data, status_code)
+
+    # Token and anonymous clients send no CSRF token, as with DRF's views.
+    view.csrf_exempt = True
+    return view
+
+
+def _find_user(email):
+    model = get_user_model()
+    try:
+        return model._default_manager.get_by_natural_key(email)
+    except model.DoesNotExist:
+        return None
+
+
+@async_post_view
+async def create_token(request):
+    """Check credentials and return the device's token."""
+    serializer = CredentialsSerializer(data=request.data)
+    if not serializer.is_valid():
+        return serializer.errors, status.HTTP_400_BAD_REQUEST
+    credentials = serializer.validated_data
+
+    user = await sync_to_async(_find_user)(credentials['email'])
+    valid = await hashing.check_password(
+        credentials['password'], user.password if user else None,
+    )
+    if not valid or not user.is_active:
+        msg = _('Unable to authenticate with provided credentials')
+        return {'non_field_errors': [msg]}, status.HTTP_400_BAD_REQUEST
+
+    token = await sync_to_async(DeviceToken.issue)(
+        user, credentials.get('device', '')
+    )
+    data = {'token': token.key, 'expires_at': token.expires_at}
+    return data, status.HTTP_200_OK
+
+
+def _save_user(serializer, encoded):
+    with transaction.atomic():
+        user = serializer.save(password=None)
+        user.password = encoded
+        user.save(update_fields=['password'])
+    return serializer.data
+
+
+@async_post_view
+async def create_user(request):
+    """Create a new user, hashing the password on the pool."""
+    serializer = UserSerializer(
+        data=request.data, context={'request': request}
+    )
+    if not await sync_to_async(serializer.is_valid)():
+        return serializer.errors, status.HTTP_400_BAD_REQUEST
+
+    password = serializer.validated_data['password']
+    encoded = await hashing.make_password(password)
+    data = await sync_to_async(_save_user)(serializer, encoded)
+    return data, status.HTTP_201_CREATED
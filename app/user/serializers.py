@@ -9,12 +9,16 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core.fieldsets import SparseFieldsetMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the users object"""
     followers_count = serializers.SerializerMethodField()
     following_count = serializers.SerializerMethodField()
 
+    field_dependencies = {'followers_count': [], 'following_count': []}
+
     class Meta:
         model = get_user_model()
         fields = ('id', 'name', 'email', 'password', 'followers_count', 'following_count')
@@ -44,13 +48,20 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.following.count()
 
 
-class AuthTokenSerializer(serializers.Serializer):
-    """Serializer for the user authentication object"""
+class CredentialsSerializer(serializers.Serializer):
+    """Serializer for login credentials, without checking them"""
     email = serializers.CharField()
     password = serializers.CharField(
         style={'input_type': 'password'},
         trim_whitespace=False,
     )
+    device = serializers.CharField(
+        required=False, allow_blank=True, max_length=255,
+    )
+
+
+class AuthTokenSerializer(CredentialsSerializer):
+    """Serializer for the user authentication object"""
 
     def validate(self, attrs):
         """Validate and authenticate the user"""
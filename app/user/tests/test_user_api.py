@@ -7,6 +7,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.tests.helpers import QueryBudgetMixin
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
@@ -82,6 +84,35 @@ class PublicUserApiTests(TestCase):
         self.assertIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_create_token_per_device(self):
+        """Test each device gets its own expiring token."""
+        create_user(email='test@example.com', password='test-user-password123')
+        payload = {
+            'email': 'test@example.com',
+            'password': 'test-user-password123',
+        }
+
+        phone = self.client.post(TOKEN_URL, {**payload, 'device': 'phone'})
+        laptop = self.client.post(TOKEN_URL, {**payload, 'device': 'laptop'})
+
+        self.assertEqual(laptop.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(phone.data['token'], laptop.data['token'])
+        self.assertIn('expires_at', laptop.data)
+
+    def test_create_token_without_device_keeps_other_clients(self):
+        """Test logging in again without a device keeps earlier tokens."""
+        create_user(email='test@example.com', password='test-user-password123')
+        payload = {
+            'email': 'test@example.com',
+            'password': 'test-user-password123',
+        }
+
+        first = self.client.post(TOKEN_URL, payload)
+        second = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['token'], second.data['token'])
+
     def test_create_token_bad_credentials(self):
         """Test that token is not created for bad credentials."""
         create_user(email='test@example.com', password='goodpass')
@@ -115,7 +146,7 @@ class PublicUserApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateUserApiTests(TestCase):
+class PrivateUserApiTests(QueryBudgetMixin, TestCase):
     """Test the private features of the user Api required auth."""
 
     def setUp(self):
@@ -136,6 +167,23 @@ class PrivateUserApiTests(TestCase):
             'email': self.user.email,
         })
 
+    def test_retrieve_profile_sparse_fields(self):
+        """Test ?fields= limits the profile and skips follower counts."""
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL, {'fields': 'id,email'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, {'id': self.user.id, 'email': self.user.email}
+        )
+
+    def test_retrieve_profile_budget(self):
+        """Test retrieving the profile stays within its query budget."""
+        with self.assertQueryBudget(2):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_post_me_not_allowed(self):
         """Test that post is not allowed for this method."""
         res = self.client.post(ME_URL, {})
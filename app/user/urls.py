@@ -2,15 +2,22 @@
 URL mappings for the user Api
 """
 from django.urls import path
-from user import views
+from user import async_views, views
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path(
+        'token/rotate/',
+        views.RotateTokenView.as_view(),
+        name='token-rotate',
+    ),
     path('me/', views.ManageUserView.as_view(), name='me'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('async/create/', async_views.create_user, name='async-create'),
+    path('async/token/', async_views.create_token, name='async-token'),
 
 ]
 
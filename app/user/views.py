@@ -1,30 +1,59 @@
 # user/views.py
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication
+from core.hashing import HashingTimingMixin
+from core.models import DeviceToken
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
 )
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(HashingTimingMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for the user"""
+def token_response(token):
+    """Return the API response describing an issued token."""
+    return Response({'token': token.key, 'expires_at': token.expires_at})
+
+
+class CreateTokenView(HashingTimingMixin, ObtainAuthToken):
+    """Create a new expiring auth token for the user's device"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = DeviceToken.issue(
+            serializer.validated_data['user'],
+            device=serializer.validated_data.get('device', ''),
+        )
+        return token_response(token)
+
+
+class RotateTokenView(APIView):
+    """Replace the current token with a new one for the same device"""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        token = DeviceToken.rotate(request.user, device=request.auth.device)
+        return token_response(token)
+
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(HashingTimingMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
@@ -35,7 +64,7 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
 class ProfileView(generics.RetrieveAPIView):
     """Retrieve profile details of the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):